@@ -1,55 +1,61 @@
 """
 认证依赖：仅保留基于 JWT 的 get_current_user
 """
-from fastapi import HTTPException, Depends, status, Header
+from fastapi import HTTPException, Depends, status, Header, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Callable, Optional
 from jose import JWTError, jwt
 from config import SECRET_KEY, ALGORITHM
-from database.database import get_db
+from database.database import get_db, SessionLocal
 from models.user import User
+from services.user_cache import (
+    CurrentUser,
+    get_cached_token_user_id,
+    cache_token,
+    get_cached_user,
+    cache_user,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def get_current_user(
-    authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    验证 Authorization Bearer JWT，并返回当前用户
-    """
+def _parse_bearer(authorization: Optional[str]) -> str:
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authorization header is required"
         )
-
     try:
         scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication scheme"
-            )
-
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload"
-            )
-
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-
-        return user
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authorization header format"
+        )
+    if scheme.lower() != "bearer":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication scheme"
+        )
+    return token
 
+def _resolve_user(token: str, load_user: Callable[[int], Optional[User]]) -> CurrentUser:
+    """
+    校验令牌并返回用户快照；令牌与用户快照均有缓存，只有未命中时才调用 load_user 查库
+    """
+    try:
+        user_id = get_cached_token_user_id(token)
+        if user_id is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            sub: str = payload.get("sub")
+            # 限定用途的票据（如推送连接票据）不能作为访问令牌使用
+            if sub is None or payload.get("scope"):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid token payload"
+                )
+            user_id = int(sub)
+            cache_token(token, user_id, payload.get("exp"))
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,5 +64,60 @@ async def get_current_user(
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authorization header format"
-        ) 
\ No newline at end of file
+            detail="Invalid token payload"
+        )
+    return _load_current_user(user_id, load_user)
+
+def _load_current_user(user_id: int, load_user: Callable[[int], Optional[User]]) -> CurrentUser:
+    current_user = get_cached_user(user_id)
+    if current_user is not None:
+        return current_user
+
+    user = load_user(user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return cache_user(user)
+
+def get_current_user(
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    """
+    验证 Authorization Bearer JWT，并返回当前用户快照
+    已验证的令牌与用户快照均有缓存，命中时不访问数据库
+    使用同步会话查询，声明为普通函数由线程池执行，等待连接池时不会阻塞事件循环
+    """
+    token = _parse_bearer(authorization)
+    return _resolve_user(token, lambda user_id: db.query(User).filter(User.id == user_id).first())
+
+def _load_user_short_lived(user_id: int) -> Optional[User]:
+    with SessionLocal() as db:
+        return db.query(User).filter(User.id == user_id).first()
+
+def get_stream_user(
+    authorization: Optional[str] = Header(None),
+    ticket: Optional[str] = Query(None, description="推送连接票据（EventSource 无法设置请求头时使用）")
+) -> CurrentUser:
+    """
+    长连接（SSE）使用的认证依赖：支持请求头或 ticket 查询参数
+    查询参数会被记录在访问日志中，因此只接受 /message/stream/ticket 签发的短期票据，不接受访问令牌
+    缓存未命中时用临时会话查询后立即归还连接，避免整个推送期间占用连接池
+    """
+    if authorization or not ticket:
+        return _resolve_user(_parse_bearer(authorization), _load_user_short_lived)
+    # 延迟导入，避免 services.auth_service 与 api 包之间的循环导入
+    from services.auth_service import STREAM_TICKET_SCOPE
+    try:
+        payload = jwt.decode(ticket, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("scope") != STREAM_TICKET_SCOPE:
+            raise ValueError
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid stream ticket"
+        )
+    return _load_current_user(user_id, _load_user_short_lived)
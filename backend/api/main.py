@@ -6,6 +6,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from .schemas.response import ApiResponse
 # from database.database import create_tables  # 移除自动建表，改用 Alembic 迁移
 from config import configure_logging, CORS_ORIGINS
+from services.http_client import close_upstream_clients
+from services.image_processing import image_processor
 import logging
 
 # 导入 API 路由器
@@ -30,6 +32,8 @@ async def lifespan(app: FastAPI):
     yield
     
     # 在应用关闭时可以添加清理逻辑
+    await close_upstream_clients()
+    image_processor.shutdown()
     logger.info("Zenith FastAPI 应用关闭。")
 
 app = FastAPI(
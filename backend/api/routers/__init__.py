@@ -3,7 +3,7 @@ from config import configure_logging, CORS_ORIGINS
 from fastapi import APIRouter
 
 # 导入所有API路由
-from . import task, comments, wechat_auth, upload, document, document_comments, project, message
+from . import task, comments, wechat_auth, upload, document, document_comments, project, message, search
 
 # 创建一个主API路由器，用于聚合所有子路由
 api_router = APIRouter()
@@ -17,6 +17,7 @@ api_router.include_router(document_comments.router, prefix="/document-comment",
 api_router.include_router(comments.router, prefix="/comment", tags=["评论管理"])  # 其他模块在用
 api_router.include_router(project.router, prefix="/project", tags=["项目管理"]) 
 api_router.include_router(message.router, prefix="/message", tags=["消息中心"])
+api_router.include_router(search.router, prefix="/search", tags=["全文搜索"])
 
 import logging
 # 在应用启动时配置日志
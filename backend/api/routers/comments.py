@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database.database import get_db
-from api.schemas.response import ApiResponse
+from database.database import get_async_db, get_async_read_db
+from api.schemas.response import ApiResponse, PaginatedResponse
 from api.schemas.comment import CommentCreate, CommentUpdate, CommentResponse
 from services.comment_service import CommentService
 from models.user import User
@@ -15,7 +15,7 @@ router = APIRouter()
 @router.post("", response_model=ApiResponse[CommentResponse], summary="创建评论")
 async def create_comment(
     comment: CommentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -37,12 +37,13 @@ async def create_comment(
             detail="创建评论失败"
         )
 
-@router.get("", response_model=ApiResponse[List[CommentResponse]], summary="获取评论列表")
+@router.get("", response_model=PaginatedResponse[List[CommentResponse]], summary="获取评论列表")
 async def get_comments(
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(20, ge=1, le=100, description="返回记录数"),
     task_id: Optional[int] = Query(None, description="任务ID过滤"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标，传入时忽略 skip"),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -50,15 +51,18 @@ async def get_comments(
     """
     try:
         comment_service = CommentService(db)
-        comments = await comment_service.get_comments(
-            current_user.id, skip, limit, task_id
+        comments, next_cursor = await comment_service.get_comments(
+            current_user.id, skip, limit, task_id, cursor
         )
-        return ApiResponse(
+        return PaginatedResponse(
             code=200,
             message="获取评论列表成功",
             data=comments,
+            next_cursor=next_cursor,
             success=True
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取评论列表失败: {str(e)}")
         raise HTTPException(
@@ -69,7 +73,7 @@ async def get_comments(
 @router.get("/{comment_id}", response_model=ApiResponse[CommentResponse], summary="获取评论详情")
 async def get_comment(
     comment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -95,7 +99,7 @@ async def get_comment(
 async def update_comment(
     comment_id: int,
     comment_update: CommentUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -120,7 +124,7 @@ async def update_comment(
 @router.delete("/{comment_id}", response_model=ApiResponse, summary="删除评论")
 async def delete_comment(
     comment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from database.database import get_db
-from api.schemas.response import ApiResponse
-from api.schemas.document import DocumentCreate, DocumentUpdate, DocumentResponse, DocumentWithComments
-from services.document_service import DocumentService
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
+from database.database import get_async_db, get_async_read_db
+from api.schemas.response import ApiResponse, PaginatedResponse
+from api.schemas.document import (
+    DocumentCreate, DocumentUpdate, DocumentResponse, DocumentSummaryResponse, DocumentWithComments,
+    DocumentContentPatch, DocumentContentPatchResult, DocumentRevisionResponse, DocumentRevisionContent,
+)
+from services.document_service import DocumentService, DocumentConflictError
 from api.dependencies import get_current_user
 import logging
 
@@ -14,7 +17,7 @@ router = APIRouter()
 @router.post("", response_model=ApiResponse[DocumentResponse], summary="创建文档")
 async def create_document(
     document: DocumentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     try:
@@ -25,26 +28,36 @@ async def create_document(
         logger.error(f"创建文档失败: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="创建文档失败")
 
-@router.get("", response_model=ApiResponse[List[DocumentResponse]], summary="获取文档列表")
+@router.get(
+    "",
+    response_model=PaginatedResponse[Union[List[DocumentResponse], List[DocumentSummaryResponse]]],
+    summary="获取文档列表"
+)
 async def get_documents(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     author_id: Optional[int] = Query(None),
     visibility: Optional[str] = Query(None),
     order_by: Optional[str] = Query(None, description="排序字段，支持-id表示降序，id表示升序"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标，仅默认排序可用，传入时忽略 skip"),
+    view: Literal["full", "summary"] = Query("full", description="summary 只返回摘要与字数，不含正文"),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     try:
         svc = DocumentService(db)
-        docs = await svc.get_documents(current_user.id, skip, limit, author_id, None, order_by)
-        return ApiResponse(code=200, message="获取文档列表成功", data=docs, success=True)
+        docs, next_cursor = await svc.get_documents(
+            current_user.id, skip, limit, author_id, None, order_by, cursor, summary=(view == "summary")
+        )
+        return PaginatedResponse(code=200, message="获取文档列表成功", data=docs, next_cursor=next_cursor, success=True)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"获取文档列表失败: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="获取文档列表失败")
 
 @router.get("/{document_id}", response_model=ApiResponse[DocumentWithComments], summary="获取文档详情")
-async def get_document(document_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def get_document(document_id: int, db: AsyncSession = Depends(get_async_read_db), current_user = Depends(get_current_user)):
     try:
         svc = DocumentService(db)
         doc = await svc.get_document(document_id, current_user.id)
@@ -54,7 +67,7 @@ async def get_document(document_id: int, db: Session = Depends(get_db), current_
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文档不存在或无权限访问")
 
 @router.put("/{document_id}", response_model=ApiResponse[DocumentResponse], summary="更新文档")
-async def update_document(document_id: int, document_update: DocumentUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def update_document(document_id: int, document_update: DocumentUpdate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
     try:
         svc = DocumentService(db)
         updated = await svc.update_document(document_id, document_update, current_user.id)
@@ -63,8 +76,81 @@ async def update_document(document_id: int, document_update: DocumentUpdate, db:
         logger.error(f"更新文档失败: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="更新文档失败")
 
+@router.patch("/{document_id}/content", response_model=ApiResponse[DocumentContentPatchResult], summary="增量修改文档正文")
+async def patch_document_content(
+    document_id: int,
+    patch: DocumentContentPatch,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        svc = DocumentService(db)
+        result = await svc.patch_document_content(document_id, patch, current_user.id)
+        return ApiResponse(code=200, message="文档更新成功", data=result, success=True)
+    except DocumentConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"增量修改文档失败: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="更新文档失败")
+
+@router.get("/{document_id}/revisions", response_model=ApiResponse[List[DocumentRevisionResponse]], summary="获取文档版本列表")
+async def list_document_revisions(
+    document_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        svc = DocumentService(db)
+        revisions = await svc.list_revisions(document_id, current_user.id, skip, limit)
+        return ApiResponse(code=200, message="获取版本列表成功", data=revisions, success=True)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error(f"获取文档版本列表失败: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="获取版本列表失败")
+
+@router.get("/{document_id}/revisions/{revision}", response_model=ApiResponse[DocumentRevisionContent], summary="获取文档历史版本内容")
+async def get_document_revision(
+    document_id: int,
+    revision: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        svc = DocumentService(db)
+        content = await svc.get_revision(document_id, revision, current_user.id)
+        return ApiResponse(code=200, message="获取版本内容成功", data=content, success=True)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error(f"获取文档版本内容失败: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="获取版本内容失败")
+
+@router.post("/{document_id}/revisions/{revision}/restore", response_model=ApiResponse[DocumentResponse], summary="恢复文档到指定版本")
+async def restore_document_revision(
+    document_id: int,
+    revision: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        svc = DocumentService(db)
+        restored = await svc.restore_revision(document_id, revision, current_user.id)
+        return ApiResponse(code=200, message="文档已恢复", data=restored, success=True)
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error(f"恢复文档版本失败: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="恢复文档失败")
+
 @router.delete("/{document_id}", response_model=ApiResponse, summary="删除文档")
-async def delete_document(document_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def delete_document(document_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
     try:
         svc = DocumentService(db)
         await svc.delete_document(document_id, current_user.id)
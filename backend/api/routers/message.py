@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from api.schemas.response import ApiResponse
-from api.schemas.message import MessageCreate, MessageResponse, UserNotificationResponse
+from api.schemas.response import ApiResponse, PaginatedResponse
+from api.schemas.message import MessageCreate, MessageResponse, UserNotificationResponse, MessageReadBatchRequest
 from services.message_service import MessageService
-from database.database import get_db
-from api.dependencies import get_current_user
+from services.notification_hub import notification_hub
+from services.auth_service import AuthService
+from database.database import get_async_db, get_async_read_db, AsyncReadSessionLocal
+from api.dependencies import get_current_user, get_stream_user
+from config import SSE_HEARTBEAT_SECONDS, SSE_TICKET_EXPIRE_SECONDS
 
 router = APIRouter(tags=["消息中心"]) 
 
 @router.post("", response_model=ApiResponse[MessageResponse], summary="创建消息并投递给接收人")
-async def create_message(payload: MessageCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def create_message(payload: MessageCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
     try:
         # 默认使用当前登录用户作为触发者
         if payload.actor_id is None:
@@ -21,34 +28,86 @@ async def create_message(payload: MessageCreate, db: Session = Depends(get_db),
     except Exception as e:
         return ApiResponse(code=400, message=f"创建失败: {e}", data=None, success=False)
 
-@router.get("/my", response_model=ApiResponse[List[UserNotificationResponse]], summary="我的通知列表")
+@router.get("/my", response_model=PaginatedResponse[List[UserNotificationResponse]], summary="我的通知列表")
 async def list_my_notifications(
     read: Optional[bool] = Query(None, description="是否已读，留空表示全部"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标，传入时忽略 skip"),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     svc = MessageService(db)
-    data = await svc.list_user_notifications(current_user.id, read, skip, limit)
-    return ApiResponse(code=200, message="ok", data=data, success=True)
+    try:
+        data, next_cursor = await svc.list_user_notifications(current_user.id, read, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PaginatedResponse(code=200, message="ok", data=data, next_cursor=next_cursor, success=True)
 
 @router.get("/my/unread-count", response_model=ApiResponse[int], summary="我的未读数量")
-async def get_unread_count(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def get_unread_count(db: AsyncSession = Depends(get_async_read_db), current_user = Depends(get_current_user)):
     svc = MessageService(db)
     count = await svc.unread_count(current_user.id)
     return ApiResponse(code=200, message="ok", data=count, success=True)
 
 @router.post("/my/{recipient_id}/read", response_model=ApiResponse[dict], summary="标记单条为已读")
-async def mark_read(recipient_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def mark_read(recipient_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
     svc = MessageService(db)
     ok = await svc.mark_read(recipient_id, current_user.id)
     if not ok:
         raise HTTPException(status_code=404, detail="记录不存在或无权限")
     return ApiResponse(code=200, message="ok", data={"id": recipient_id, "read": True}, success=True)
 
+@router.post("/my/read-batch", response_model=ApiResponse[dict], summary="批量标记为已读")
+async def mark_read_batch(payload: MessageReadBatchRequest, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    svc = MessageService(db)
+    count = await svc.mark_read_batch(payload.ids, current_user.id)
+    return ApiResponse(code=200, message="ok", data={"affected": count}, success=True)
+
 @router.post("/my/read-all", response_model=ApiResponse[dict], summary="全部标记为已读")
-async def mark_all_read(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def mark_all_read(db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
     svc = MessageService(db)
     count = await svc.mark_all_read(current_user.id)
     return ApiResponse(code=200, message="ok", data={"affected": count}, success=True)
+
+@router.post("/stream/ticket", response_model=ApiResponse[dict], summary="获取通知推送连接票据")
+async def create_stream_ticket(current_user = Depends(get_current_user)):
+    """
+    签发短期票据，以 /stream?ticket=... 建立推送连接；票据仅能用于推送连接，过期后需重新获取
+    """
+    ticket = AuthService().create_stream_ticket(current_user.id)
+    return ApiResponse(code=200, message="ok", data={"ticket": ticket, "expires_in": SSE_TICKET_EXPIRE_SECONDS}, success=True)
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+@router.get("/stream", summary="通知实时推送（SSE）")
+async def stream_notifications(request: Request, current_user = Depends(get_stream_user)):
+    """
+    以 Server-Sent Events 推送新通知（notification）与未读数变化（unread_count），
+    空闲时定期发送心跳注释，防止代理断开连接。连接期间不占用数据库连接。
+    """
+    user_id = current_user.id
+    async with AsyncReadSessionLocal() as db:
+        initial_count = await MessageService(db).unread_count(user_id)
+
+    async def event_stream():
+        queue = notification_hub.subscribe(user_id)
+        try:
+            yield _sse_event("unread_count", {"count": initial_count})
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                    yield _sse_event(event, data)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+        finally:
+            notification_hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database.database import get_db
-from api.schemas.response import ApiResponse
+from database.database import get_async_db, get_async_read_db
+from api.schemas.response import ApiResponse, PaginatedResponse
 from api.schemas.project import ProjectCreate, ProjectUpdate, ProjectResponse, ProjectWithMembers
 from services.project_service import ProjectService
-from models.user import User
+from services.user_cache import CurrentUser
 from api.dependencies import get_current_user
 import logging
 
@@ -15,8 +15,8 @@ router = APIRouter()
 @router.post("", response_model=ApiResponse[ProjectResponse], summary="创建项目")
 async def create_project(
     project: ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     创建新项目
@@ -37,28 +37,35 @@ async def create_project(
             detail="创建项目失败"
         )
 
-@router.get("", response_model=ApiResponse[List[ProjectResponse]], summary="获取用户项目列表")
+@router.get("", response_model=PaginatedResponse[List[ProjectResponse]], summary="获取用户项目列表")
 async def get_user_projects(
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(20, ge=1, le=100, description="返回记录数"),
     status_filter: Optional[str] = Query(None, description="项目状态过滤"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="分页游标，传入时忽略 skip"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     获取当前用户参与的项目列表
     """
     try:
         project_service = ProjectService(db)
-        projects = await project_service.get_user_projects(
-            current_user.id, skip, limit, status_filter
+        projects, next_cursor = await project_service.get_user_projects(
+            current_user.id, skip, limit, status_filter, cursor
         )
-        return ApiResponse(
+        return PaginatedResponse(
             code=200,
             message="获取项目列表成功",
             data=projects,
+            next_cursor=next_cursor,
             success=True
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"获取项目列表失败: {str(e)}")
         raise HTTPException(
@@ -69,8 +76,8 @@ async def get_user_projects(
 @router.get("/{project_id}", response_model=ApiResponse[ProjectWithMembers], summary="获取项目详情")
 async def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     获取项目详情
@@ -95,8 +102,8 @@ async def get_project(
 async def update_project(
     project_id: int,
     project_update: ProjectUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     更新项目信息
@@ -122,8 +129,8 @@ async def update_project(
 @router.delete("/{project_id}", response_model=ApiResponse[dict], summary="删除项目")
 async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     删除项目
@@ -147,8 +154,8 @@ async def delete_project(
 @router.post("/{project_id}/archive", response_model=ApiResponse[ProjectResponse], summary="归档项目")
 async def archive_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     归档项目
@@ -175,8 +182,8 @@ async def archive_project(
 @router.post("/{project_id}/activate", response_model=ApiResponse[ProjectResponse], summary="激活项目")
 async def activate_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     激活已归档的项目
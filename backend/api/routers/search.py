@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database.database import get_async_read_db
+from api.schemas.response import ApiResponse
+from api.schemas.search import SearchResult, SearchType
+from services.search_service import SearchService
+from api.dependencies import get_current_user
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("", response_model=ApiResponse[List[SearchResult]], summary="全文搜索")
+async def search(
+    q: str = Query(..., min_length=1, max_length=100, description="搜索词，空格分隔多个词（同时命中），至少包含一个不少于 3 个字符的词"),
+    types: Optional[List[SearchType]] = Query(None, description="限定结果类型，可多选"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        svc = SearchService(db)
+        results = await svc.search(current_user.id, q, types, skip, limit)
+        return ApiResponse(code=200, message="搜索成功", data=results, success=True)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"全文搜索失败: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="搜索失败")
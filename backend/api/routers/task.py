@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database.database import get_db
-from api.schemas.response import ApiResponse
+from database.database import get_async_db, get_async_read_db
+from api.schemas.response import ApiResponse, PaginatedResponse
 from api.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskWithSubtasks
 from api.schemas.comment import CommentResponse
 from services.task_service import TaskService
@@ -17,7 +17,7 @@ router = APIRouter()
 @router.post("", response_model=ApiResponse[TaskResponse], summary="创建任务")
 async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -39,14 +39,15 @@ async def create_task(
             detail="创建任务失败"
         )
 
-@router.get("", response_model=ApiResponse[List[TaskResponse]], summary="获取任务列表")
+@router.get("", response_model=PaginatedResponse[List[TaskResponse]], summary="获取任务列表")
 async def get_tasks(
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(20, ge=1, le=100, description="返回记录数"),
     project_id: Optional[int] = Query(None, description="项目ID过滤"),
     status_filter: Optional[str] = Query(None, description="任务状态过滤"),
     assignee_id: Optional[int] = Query(None, description="指派用户过滤"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标，传入时忽略 skip"),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -54,15 +55,22 @@ async def get_tasks(
     """
     try:
         task_service = TaskService(db)
-        tasks = await task_service.get_tasks(
-            current_user.id, skip, limit, project_id, status_filter, assignee_id
+        tasks, total, next_cursor = await task_service.get_tasks(
+            current_user.id, skip, limit, project_id, status_filter, assignee_id, cursor
         )
-        return ApiResponse(
+        return PaginatedResponse(
             code=200,
             message="获取任务列表成功",
             data=tasks,
+            total=total,
+            next_cursor=next_cursor,
             success=True
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"获取任务列表失败: {str(e)}")
         raise HTTPException(
@@ -73,7 +81,7 @@ async def get_tasks(
 @router.get("/{task_id}", response_model=ApiResponse[TaskWithSubtasks], summary="获取任务详情")
 async def get_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -99,7 +107,7 @@ async def get_task(
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -124,7 +132,7 @@ async def update_task(
 @router.delete("/{task_id}", response_model=ApiResponse, summary="删除任务")
 async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -146,12 +154,13 @@ async def delete_task(
             detail="删除任务失败"
         )
 
-@router.get("/{task_id}/comments", response_model=ApiResponse[List[CommentResponse]], summary="获取任务评论")
+@router.get("/{task_id}/comments", response_model=PaginatedResponse[List[CommentResponse]], summary="获取任务评论")
 async def get_task_comments(
     task_id: int,
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(20, ge=1, le=100, description="返回记录数"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标，传入时忽略 skip"),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -159,15 +168,18 @@ async def get_task_comments(
     """
     try:
         comment_service = CommentService(db)
-        comments = await comment_service.get_comments(
-            current_user.id, skip, limit, task_id=task_id
+        comments, next_cursor = await comment_service.get_comments(
+            current_user.id, skip, limit, task_id=task_id, cursor=cursor
         )
-        return ApiResponse(
+        return PaginatedResponse(
             code=200,
             message="获取任务评论成功",
             data=comments,
+            next_cursor=next_cursor,
             success=True
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取任务评论失败: {str(e)}")
         raise HTTPException(
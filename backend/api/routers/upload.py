@@ -1,31 +1,48 @@
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Form
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Form, Request, Response, Query
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from email.utils import formatdate, parsedate_to_datetime
 import os
-import uuid
-import shutil
+import re
+import asyncio
+import hashlib
 from pathlib import Path
 from typing import Optional
 import mimetypes
-from PIL import Image
-import io
+from concurrent.futures.process import BrokenProcessPool
 
-from ..dependencies import get_db, get_current_user
-from models.user import User
+from ..dependencies import get_current_user
+from config import UPLOAD_DIR as UPLOAD_ROOT
+from database.database import get_async_db, get_async_read_db
+from services.user_cache import CurrentUser
+from services.image_processing import image_processor, ImageQueueFullError
+from services.file_storage import FileTooLargeError, stream_to_temp, make_temp_path, discard
+from services.upload_service import (
+    UploadService,
+    BLOB_DIR,
+    blob_path,
+    parse_blob_name,
+    missing_renditions,
+    select_rendition,
+)
 from ..schemas.upload import UploadResponse, UploadType
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
-# 配置文件存储路径
-UPLOAD_DIR = Path("uploads")
+# 配置文件存储路径，与内容寻址存储（BLOB_DIR）同在 config.UPLOAD_DIR 下
+UPLOAD_DIR = Path(UPLOAD_ROOT)
 AVATAR_DIR = UPLOAD_DIR / "avatars"
 DOCUMENT_DIR = UPLOAD_DIR / "documents"
 IMAGE_DIR = UPLOAD_DIR / "images"
 
-# 确保上传目录存在
-for directory in [UPLOAD_DIR, AVATAR_DIR, DOCUMENT_DIR, IMAGE_DIR]:
+# 确保上传目录存在（avatars/documents/images 仅用于读取和删除旧的 uuid 文件名文件）
+for directory in [UPLOAD_DIR, AVATAR_DIR, DOCUMENT_DIR, IMAGE_DIR, BLOB_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
 
+# 文件名为 uuid 或内容哈希的文件内容不会变化，可永久缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+UUID_NAME_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(\.[0-9A-Za-z_-]+)?$")
+
 # 允许的文件类型
 ALLOWED_IMAGE_TYPES = {
     "image/jpeg": [".jpg", ".jpeg"],
@@ -60,19 +77,6 @@ def validate_file_type(file: UploadFile, upload_type: str) -> bool:
     return False
 
 
-def validate_file_size(file: UploadFile, upload_type: str) -> bool:
-    """验证文件大小"""
-    if upload_type not in MAX_FILE_SIZE:
-        return False
-    
-    # 获取文件大小
-    file.file.seek(0, 2)  # 移动到文件末尾
-    size = file.file.tell()
-    file.file.seek(0)  # 重置到文件开头
-    
-    return size <= MAX_FILE_SIZE[upload_type]
-
-
 def get_file_extension(filename: str, content_type: str) -> str:
     """获取文件扩展名"""
     # 首先尝试从文件名获取
@@ -88,40 +92,38 @@ def get_file_extension(filename: str, content_type: str) -> str:
     return ".bin"
 
 
-def resize_image(image_data: bytes, max_size: tuple = (800, 800)) -> bytes:
-    """调整图片大小"""
-    try:
-        image = Image.open(io.BytesIO(image_data))
-        
-        # 如果是 RGBA 模式，转换为 RGB
-        if image.mode in ('RGBA', 'LA'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'RGBA':
-                background.paste(image, mask=image.split()[-1])
-            else:
-                background.paste(image, mask=image.split()[-1])
-            image = background
-        
-        # 调整大小，保持宽高比
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # 保存到字节流
-        output = io.BytesIO()
-        image.save(output, format='JPEG', quality=85, optimize=True)
-        return output.getvalue()
-    except Exception as e:
-        print(f"图片处理失败: {e}")
-        return image_data
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match 使用弱比较，忽略 W/ 前缀
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags
+
+
+def _is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """按 If-None-Match / If-Modified-Since 判断客户端缓存是否仍然有效，前者优先"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
 
 
 @router.post("/file", response_model=UploadResponse, summary="通用文件上传")
 async def upload_file(
     file: UploadFile = File(...),
     type: str = Form("image"),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     通用文件上传接口
+    文件按内容哈希存储，相同内容只保存一份并返回相同的 URL
     
     - **file**: 要上传的文件
     - **type**: 文件类型 (avatar, image, document)
@@ -139,53 +141,62 @@ async def upload_file(
                 detail=f"不支持的文件类型。支持的类型: {', '.join(allowed_types)}"
             )
         
-        # 验证文件大小
-        if not validate_file_size(file, type):
+        file_extension = get_file_extension(file.filename, file.content_type)
+        
+        # 分块写入临时文件，边写边校验大小并计算哈希
+        try:
+            upload = await stream_to_temp(file, BLOB_DIR, MAX_FILE_SIZE[type])
+        except FileTooLargeError:
             max_size_mb = MAX_FILE_SIZE[type] / (1024 * 1024)
             raise HTTPException(
                 status_code=400, 
                 detail=f"文件大小不能超过 {max_size_mb}MB"
             )
         
-        # 生成唯一文件名
-        file_extension = get_file_extension(file.filename, file.content_type)
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        
-        # 确定保存目录
-        if type == "avatar":
-            save_dir = AVATAR_DIR
-        elif type == "document":
-            save_dir = DOCUMENT_DIR
-        else:
-            save_dir = IMAGE_DIR
-        
-        file_path = save_dir / unique_filename
-        
-        # 读取文件内容
-        file_content = await file.read()
-        
-        # 如果是图片，进行压缩处理
-        if type in ["avatar", "image"] and file.content_type.startswith("image/"):
-            if type == "avatar":
-                file_content = resize_image(file_content, (400, 400))
+        upload_service = UploadService(db)
+        try:
+            # 如果是图片，在进程池中进行压缩处理，结果写入新的临时文件
+            if type in ["avatar", "image"] and file.content_type.startswith("image/"):
+                max_size = (400, 400) if type == "avatar" else (1200, 1200)
+                resized_path = make_temp_path(BLOB_DIR)
+                try:
+                    file_size, file_hash = await image_processor.resize_file(upload.path, resized_path, max_size)
+                    stored_filename = await upload_service.store(
+                        resized_path, file_hash, file_size, file_extension, file.content_type, current_user.id
+                    )
+                except ImageQueueFullError as e:
+                    raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+                except asyncio.TimeoutError:
+                    raise HTTPException(status_code=504, detail="图片处理超时")
+                except BrokenProcessPool:
+                    # 工作进程异常退出，进程池已重建，仅本次请求失败
+                    raise HTTPException(status_code=503, detail="图片处理失败，请重试", headers={"Retry-After": "1"})
+                finally:
+                    discard(resized_path)
+                # 后台预生成各尺寸缩略图，不阻塞本次上传
+                targets = missing_renditions(file_hash)
+                if targets:
+                    image_processor.submit_renditions(blob_path(file_hash), targets)
             else:
-                file_content = resize_image(file_content, (1200, 1200))
-        
-        # 保存文件
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+                file_size, file_hash = upload.size, upload.sha256
+                stored_filename = await upload_service.store(
+                    upload.path, file_hash, file_size, file_extension, file.content_type, current_user.id
+                )
+        finally:
+            discard(upload.path)
         
         # 生成文件URL
-        file_url = f"/api/upload/files/{type}/{unique_filename}"
+        file_url = f"/api/upload/files/{type}/{stored_filename}"
         
         return UploadResponse(
             success=True,
             message="文件上传成功",
             data={
                 "url": file_url,
-                "filename": unique_filename,
+                "filename": stored_filename,
                 "original_filename": file.filename,
-                "size": len(file_content),
+                "size": file_size,
+                "sha256": file_hash,
                 "type": file.content_type
             }
         )
@@ -197,38 +208,98 @@ async def upload_file(
         raise HTTPException(status_code=500, detail="文件上传失败")
 
 
+@router.get("/metrics", summary="图片处理队列指标")
+async def get_upload_metrics(current_user: CurrentUser = Depends(get_current_user)):
+    """
+    返回图片处理进程池的排队深度、处理中任务数与处理耗时统计
+    """
+    return {
+        "success": True,
+        "message": "ok",
+        "data": image_processor.metrics()
+    }
+
+
 @router.get("/files/{file_type}/{filename}", summary="获取上传的文件")
-async def get_uploaded_file(file_type: str, filename: str):
+async def get_uploaded_file(
+    file_type: str,
+    filename: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="期望的图片宽度，返回不小于该尺寸的缩略图"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """
     获取上传的文件
+    支持 ETag / Last-Modified 条件请求（304）与 Range 分段请求；
+    图片可通过 w 参数获取缩略图，并按 Accept 优先返回 WebP
     
     - **file_type**: 文件类型 (avatar, image, document)
     - **filename**: 文件名
     """
     try:
-        # 确定文件路径
-        if file_type == "avatar":
+        if file_type not in ["avatar", "image", "document"]:
+            raise HTTPException(status_code=400, detail="不支持的文件类型")
+        
+        sha256 = parse_blob_name(filename)
+        # 响应类型按 URL 中的扩展名推断，必须与上传时记录的扩展名一致，防止以 .html 等类型取回任意文件
+        if sha256 and await UploadService(db).get_ext(sha256) != filename[len(sha256):]:
+            raise HTTPException(status_code=404, detail="文件不存在")
+        rendition = None
+        if sha256 and w and file_type in ["avatar", "image"]:
+            rendition = select_rendition(sha256, w, request.headers.get("accept", ""))
+        if rendition:
+            file_path, rendition_format = rendition
+        elif sha256:
+            file_path = blob_path(sha256)
+        elif file_type == "avatar":
             file_path = AVATAR_DIR / filename
         elif file_type == "image":
             file_path = IMAGE_DIR / filename
-        elif file_type == "document":
-            file_path = DOCUMENT_DIR / filename
         else:
-            raise HTTPException(status_code=400, detail="不支持的文件类型")
+            file_path = DOCUMENT_DIR / filename
         
         # 检查文件是否存在
-        if not file_path.exists():
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="文件不存在")
         
+        # 内容哈希文件直接以哈希作为强 ETag，其余文件按修改时间和大小生成
+        if rendition:
+            etag = f'"{file_path.name}"'
+        elif sha256:
+            etag = f'"{sha256}"'
+        else:
+            etag = f'"{hashlib.md5(f"{stat_result.st_mtime}-{stat_result.st_size}".encode(), usedforsecurity=False).hexdigest()}"'
+        # 请求缩略图但尚未生成时临时返回原图，此时不能永久缓存
+        immutable = bool(sha256 or UUID_NAME_RE.match(filename)) and not (w and not rendition)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else "no-cache",
+            "X-Content-Type-Options": "nosniff",
+        }
+        if rendition:
+            headers["Vary"] = "Accept"
+        
+        if _is_not_modified(request, etag, stat_result.st_mtime):
+            return Response(status_code=304, headers=headers)
+        
         # 获取 MIME 类型
-        mime_type, _ = mimetypes.guess_type(str(file_path))
+        if rendition:
+            mime_type = f"image/{rendition_format}"
+        else:
+            mime_type, _ = mimetypes.guess_type(filename)
         if not mime_type:
             mime_type = "application/octet-stream"
         
+        # FileResponse 负责 Range / If-Range 分段响应
         return FileResponse(
             path=str(file_path),
             media_type=mime_type,
-            filename=filename
+            filename=filename,
+            headers=headers,
+            stat_result=stat_result
         )
         
     except HTTPException:
@@ -242,15 +313,26 @@ async def get_uploaded_file(file_type: str, filename: str):
 async def delete_uploaded_file(
     file_type: str, 
     filename: str,
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     删除上传的文件
+    内容寻址文件只释放当前用户上传时持有的一次引用，引用归零时才删除文件
     
     - **file_type**: 文件类型 (avatar, image, document)
     - **filename**: 文件名
     """
     try:
+        sha256 = parse_blob_name(filename)
+        if sha256 and file_type in ["avatar", "image", "document"]:
+            if not await UploadService(db).release(sha256, current_user.id):
+                raise HTTPException(status_code=404, detail="文件不存在或无权删除")
+            return {
+                "success": True,
+                "message": "文件删除成功"
+            }
+        
         # 确定文件路径
         if file_type == "avatar":
             file_path = AVATAR_DIR / filename
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 import httpx
 import os
 import logging
-from config import AUTH_API_KEY, AUTH_API_BASE_URL
+from config import (
+    AUTH_API_KEY,
+    AUTH_API_BASE_URL,
+    WECHAT_STATUS_CACHE_TTL,
+    WECHAT_STATUS_CACHE_SIZE,
+    WECHAT_STATUS_MAX_WAIT,
+)
 from sqlalchemy.orm import Session
 from database.database import get_db
 from services.auth_service import AuthService
@@ -11,12 +17,16 @@ from api.schemas.wechat_proxy import WechatAuthData, RefreshTokenRequest
 from api.schemas.user import UserResponse, UserUpdate, UserStatus
 from models.user import User
 from api.dependencies import get_current_user
+from services.user_cache import CurrentUser, invalidate_user
 from services.user_service import UserService
+from services.http_client import get_upstream_client
+from services.wechat_status import LoginStatusCoalescer
 from typing import Optional
 from datetime import datetime, timezone, timedelta
 
 router = APIRouter(tags=["微信认证"])
 logger = logging.getLogger(__name__)
+auth_api = get_upstream_client("auth_api")
 
 # 确保AUTH_API_KEY和AUTH_API_BASE_URL已配置
 if not AUTH_API_KEY or not AUTH_API_BASE_URL:
@@ -38,17 +48,16 @@ async def generate_wechat_login_credentials(redirect: str | None = None):
 
     logger.info("==============")
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(api_url, headers=headers, json=payload)
-            response.raise_for_status()
-            response_data = response.json()
-            logger.info(f"上游API响应: {response_data}")
-            return ApiResponse(
-                success=response_data.get("success", True),
-                message=response_data.get("message", "Success"),
-                data=WechatAuthData(**response_data.get("data", {})),
-                code=response_data.get("code", 200)
-            )
+        response = await auth_api.post(api_url, headers=headers, json=payload)
+        response.raise_for_status()
+        response_data = response.json()
+        logger.info(f"上游API响应: {response_data}")
+        return ApiResponse(
+            success=response_data.get("success", True),
+            message=response_data.get("message", "Success"),
+            data=WechatAuthData(**response_data.get("data", {})),
+            code=response_data.get("code", 200)
+        )
     except httpx.HTTPStatusError as e:
         return ApiResponse(code=e.response.status_code, success=False, message=f"上游API返回错误: {e.response.text}")
     except httpx.RequestError as e:
@@ -57,28 +66,45 @@ async def generate_wechat_login_credentials(redirect: str | None = None):
         return ApiResponse(code=500, success=False, message=f"生成微信登录凭据失败: {str(e)}")
 
 
+async def _fetch_login_status(key: str) -> dict:
+    api_url = f"{AUTH_API_BASE_URL}/auth/status/{key}"
+    logger.info(f"请求上游API URL: {api_url}")
+    response = await auth_api.get(api_url)
+    logger.info(f"上游API响应状态码: {response.status_code}")
+    response.raise_for_status()
+    response_data = response.json()
+    logger.info(f"上游API响应数据: {response_data}")
+    return response_data
+
+
+login_status = LoginStatusCoalescer(
+    _fetch_login_status, ttl=WECHAT_STATUS_CACHE_TTL, maxsize=WECHAT_STATUS_CACHE_SIZE
+)
+
+
 @router.get("/status/{key}", response_model=ApiResponse[WechatAuthData], summary="检查微信扫码登录状态")
-async def get_wechat_login_status(key: str):
+async def get_wechat_login_status(
+    key: str,
+    wait: float = Query(0, ge=0, le=WECHAT_STATUS_MAX_WAIT, description="长轮询等待秒数，0 表示立即返回"),
+    last_status: Optional[str] = Query(None, description="客户端已知的状态，长轮询时等待其发生变化"),
+):
     """
     检查用户扫码登录状态。
+    同一 key 的并发查询合并为一次上游请求并短时缓存；传入 wait 时挂起直到状态变化或超时。
     """
-    api_url = f"{AUTH_API_BASE_URL}/auth/status/{key}"
-    logger.info(f"请求上游API URL: {api_url}")
     logger.info(f"检查的key: {key}")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url)
-            logger.info(f"上游API响应状态码: {response.status_code}")
-            response.raise_for_status()
-            response_data = response.json()
-            logger.info(f"上游API响应数据: {response_data}")
-            return ApiResponse(
-                success=response_data.get("success", True),
-                message=response_data.get("message", "Success"),
-                data=WechatAuthData(**response_data.get("data", {})),
-                code=response_data.get("code", 200)
-            )
+        if wait > 0:
+            response_data = await login_status.wait_for_change(key, last_status, wait)
+        else:
+            response_data = await login_status.get(key)
+        return ApiResponse(
+            success=response_data.get("success", True),
+            message=response_data.get("message", "Success"),
+            data=WechatAuthData(**response_data.get("data", {})),
+            code=response_data.get("code", 200)
+        )
     except httpx.HTTPStatusError as e:
         logger.error(f"上游API HTTP错误: {e.response.status_code} - {e.response.text}")
         return ApiResponse(code=e.response.status_code, success=False, message=f"上游API返回错误: {e.response.text}")
@@ -103,17 +129,16 @@ async def get_openid(code: str, db: Session = Depends(get_db)):
         headers = {"x-api-key": AUTH_API_KEY}
         params = {"code": code}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers, params=params)
-            response.raise_for_status()
-            response_data = response.json()
-            
-            if not response_data.get("success"):
-                raise HTTPException(status_code=400, detail="微信API返回错误")
-            
-            openid = response_data.get("data", {}).get("openid")
-            if not openid:
-                raise HTTPException(status_code=400, detail="未能从微信API获取到openid")
+        response = await auth_api.get(api_url, headers=headers, params=params)
+        response.raise_for_status()
+        response_data = response.json()
+        
+        if not response_data.get("success"):
+            raise HTTPException(status_code=400, detail="微信API返回错误")
+        
+        openid = response_data.get("data", {}).get("openid")
+        if not openid:
+            raise HTTPException(status_code=400, detail="未能从微信API获取到openid")
 
         # 获取或创建用户
         user = auth_service.get_or_create_user_by_openid(db, openid)
@@ -180,7 +205,7 @@ async def refresh_token(
 
 @router.get("/me", response_model=ApiResponse[UserResponse], summary="获取当前登录用户信息")
 async def read_users_me(
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -217,7 +242,7 @@ async def read_users_me(
 @router.put("/profile", response_model=ApiResponse[UserResponse], summary="更新用户资料")
 async def update_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -258,7 +283,7 @@ async def update_profile(
 
 @router.get("/check-first-user", response_model=ApiResponse[dict], summary="检查是否为系统首个用户")
 async def check_first_user(
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -287,9 +312,11 @@ async def check_first_user(
         if is_first_user:
             try:
                 # 更新用户角色为管理员，状态为已通过
-                current_user.role = "管理员"
-                current_user.status = "已通过"
+                # current_user 是缓存快照，需要通过会话中的用户对象更新
+                first_user.role = "管理员"
+                first_user.status = "已通过"
                 db.commit()
+                invalidate_user(first_user.id)
                 
                 logger.info(f"用户 {current_user.id} 自动设置为管理员")
                 
@@ -339,7 +366,7 @@ async def check_first_user(
 async def get_users(
     include_all: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     获取用户列表
@@ -414,7 +441,7 @@ async def get_users(
 async def approve_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     审批用户，只有管理员可以操作
@@ -442,6 +469,7 @@ async def approve_user(
         # 更新用户状态为已通过
         user.status = "已通过"
         db.commit()
+        invalidate_user(user_id)
         
         return ApiResponse(
             success=True,
@@ -465,7 +493,7 @@ async def approve_user(
 async def reject_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     拒绝用户，只有管理员可以操作
@@ -493,6 +521,7 @@ async def reject_user(
         # 更新用户状态为已拒绝
         user.status = "已拒绝"
         db.commit()
+        invalidate_user(user_id)
         
         return ApiResponse(
             success=True,
@@ -517,7 +546,7 @@ async def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     更新用户信息，管理员可以更新任何用户，普通用户只能更新自己
@@ -568,6 +597,7 @@ async def update_user(
         
         db.commit()
         db.refresh(user)
+        invalidate_user(user_id)
         
         # 返回更新后的用户信息
         return ApiResponse(
@@ -590,7 +620,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     删除用户，只有管理员可以操作，且不能删除自己
@@ -627,6 +657,7 @@ async def delete_user(
         # 删除用户
         db.delete(user)
         db.commit()
+        invalidate_user(user_id)
         
         return ApiResponse(
             success=True,
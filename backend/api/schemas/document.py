@@ -21,9 +21,53 @@ class DocumentResponse(DocumentBase):
     id: int
     author_id: int
     specific_user_ids: Optional[List[int]] = Field(None, description="指定用户ID列表")
+    content_hash: Optional[str] = Field(None, description="正文哈希，增量修改时作为基准版本")
     created_at: datetime
     updated_at: datetime
 
+class DocumentSummaryResponse(BaseModel):
+    """文档列表精简视图：不含正文，仅返回摘要与字数"""
+    id: int
+    title: str
+    project_id: Optional[int] = None
+    project_name: Optional[str] = None
+    author_id: int
+    author_name: Optional[str] = None
+    excerpt: Optional[str] = None
+    word_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+class DocumentContentSplice(BaseModel):
+    start: int = Field(..., ge=0, description="起始位置（UTF-16 码元，相对于基准版本）")
+    end: int = Field(..., ge=0, description="结束位置（不含），等于 start 表示插入")
+    text: str = Field("", description="替换后的文本，为空表示删除")
+
+class DocumentContentPatch(BaseModel):
+    base_hash: str = Field(..., min_length=64, max_length=64, description="客户端修改所基于的正文哈希")
+    splices: List[DocumentContentSplice] = Field(..., min_length=1, max_length=1000, description="替换操作，按 start 升序且互不重叠")
+
+class DocumentContentPatchResult(BaseModel):
+    """增量修改结果：不回传正文"""
+    id: int
+    content_hash: str
+    word_count: int
+    updated_at: datetime
+
+class DocumentRevisionResponse(BaseModel):
+    """版本信息，不含正文"""
+    revision: int
+    title: str
+    content_hash: str
+    size: int = Field(..., description="正文字符数")
+    stored_size: int = Field(..., description="压缩后存储字节数")
+    is_snapshot: bool = Field(..., description="是否为完整快照")
+    author_id: Optional[int] = None
+    created_at: datetime
+
+class DocumentRevisionContent(DocumentRevisionResponse):
+    content: str = Field(..., description="该版本的文档内容(Markdown)")
+
 class DocumentWithComments(DocumentResponse):
     comments: List['DocumentCommentResponse'] = []
 
@@ -15,6 +15,8 @@ class MessageBase(BaseModel):
 class MessageCreate(MessageBase):
     # 接收人列表，创建时用于展开message_recipient
     recipient_user_ids: List[int] = Field(default_factory=list, description="接收人用户ID列表")
+    # 按项目群发：投递给该项目的全部成员（与 recipient_user_ids 合并去重）
+    recipient_project_id: Optional[int] = Field(None, description="接收项目ID，投递给项目全部成员")
 
 class MessageResponse(MessageBase):
     id: int
@@ -44,3 +46,6 @@ class UserNotificationResponse(BaseModel):
     read: bool
     read_at: Optional[datetime]
     delivered_at: datetime
+
+class MessageReadBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500, description="接收记录ID列表")
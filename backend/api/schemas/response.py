@@ -14,4 +14,12 @@ class ApiResponse(BaseModel, Generic[T]):
     success: bool = Field(..., description="指示请求是否成功")
 
     class Config:
-        arbitrary_types_allowed = True  # 允许任意类型，以支持泛型 
\ No newline at end of file
+        arbitrary_types_allowed = True  # 允许任意类型，以支持泛型
+
+
+class PaginatedResponse(ApiResponse[T], Generic[T]):
+    """
+    带分页信息的统一API响应模型。
+    """
+    total: Optional[int] = Field(None, description="符合条件的总记录数")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
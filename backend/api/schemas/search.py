@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+SearchType = Literal["document", "task", "subtask", "comment", "document_comment"]
+
+class SearchResult(BaseModel):
+    type: SearchType = Field(..., description="结果类型")
+    id: int = Field(..., description="实体ID")
+    parent_id: Optional[int] = Field(None, description="所属任务/文档ID（子任务与评论）")
+    title: str = Field(..., description="标题（已做 HTML 转义），命中词以 <mark> 标记")
+    snippet: str = Field(..., description="正文片段（已做 HTML 转义），命中词以 <mark> 标记")
+    score: float = Field(..., description="相关度，越大越相关")
@@ -24,6 +24,7 @@ class TaskPriority(str, Enum):
     HIGH = "high"
 
 class SubtaskCreate(BaseModel):
+    id: Optional[str] = Field(None, description="子任务ID，更新已有子任务时传入")
     title: str = Field(..., description="子任务标题")
     content: Optional[str] = Field(None, description="子任务内容")
     assignee_id: Optional[int] = Field(None, description="子任务处理人ID")
@@ -16,6 +16,7 @@ class FileData(BaseModel):
     filename: str
     original_filename: Optional[str] = None
     size: int
+    sha256: Optional[str] = None
     type: str
 
 
@@ -9,23 +9,72 @@ load_dotenv()
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/zenboard.db")
 
+# SQLite 连接参数（每个新连接建立时通过 PRAGMA 应用）
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # WAL 模式下读写互不阻塞
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # 写锁等待时间，避免直接报 database is locked
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))  # 256MB
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # 负数表示 KiB，即 64MB
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+# 现有的删除逻辑依赖未启用的外键约束，默认保持关闭
+SQLITE_FOREIGN_KEYS = os.getenv("SQLITE_FOREIGN_KEYS", "false").lower() in ("1", "true", "yes", "on")
+
+# 连接池配置
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# 只读连接池（供 GET 接口使用）
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "10"))
+
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+# 认证缓存配置（当前用户快照与已验证令牌）
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))  # 秒
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+
 # WeChat Proxy Configuration (参考datagentic项目)
 AUTH_API_KEY = os.getenv("AUTH_API_KEY", "your-auth-api-key")
 AUTH_API_BASE_URL = os.getenv("AUTH_API_BASE_URL", "https://your-auth-service.com")
 
+# 上游 HTTP 客户端配置（连接池、超时、重试与熔断）
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "10"))
+UPSTREAM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "3"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "50"))
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))  # 秒
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.2"))  # 秒，按次数指数增长
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))  # 连续失败次数
+UPSTREAM_BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))  # 秒
+
 
 # QR Code Configuration
 QR_CODE_EXPIRE_MINUTES = int(os.getenv("QR_CODE_EXPIRE_MINUTES", "5"))
+# 扫码状态查询合并：同一 key 的上游结果缓存秒数，以及长轮询最长等待秒数
+WECHAT_STATUS_CACHE_TTL = float(os.getenv("WECHAT_STATUS_CACHE_TTL", "1"))
+WECHAT_STATUS_CACHE_SIZE = int(os.getenv("WECHAT_STATUS_CACHE_SIZE", "10000"))
+WECHAT_STATUS_MAX_WAIT = float(os.getenv("WECHAT_STATUS_MAX_WAIT", "25"))
 
 # File Upload Configuration
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "65536"))  # 流式写入的块大小（字节）
+# 图片处理进程池：工作进程数、排队上限与单个任务超时秒数
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE", "16"))
+IMAGE_JOB_TIMEOUT = float(os.getenv("IMAGE_JOB_TIMEOUT", "10"))
+# 上传图片时在后台预生成的缩略图尺寸（最长边像素）与格式
+IMAGE_RENDITION_SIZES = [int(s) for s in os.getenv("IMAGE_RENDITION_SIZES", "48,128,400,1200").split(",") if s.strip()]
+IMAGE_RENDITION_FORMATS = [f.strip() for f in os.getenv("IMAGE_RENDITION_FORMATS", "jpeg,webp").split(",") if f.strip()]
+# 缩略图任务单独限流，后台任务不占用上传缩放的排队名额
+IMAGE_RENDITION_QUEUE_SIZE = int(os.getenv("IMAGE_RENDITION_QUEUE_SIZE", "4"))
 
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -58,6 +107,19 @@ CORS_ORIGINS = [
     "https://app.zenith-collab.com",
 ]
 
+# Message Configuration
+MESSAGE_UNREAD_CACHE_TTL = int(os.getenv("MESSAGE_UNREAD_CACHE_TTL", "30"))  # 未读数缓存时间（秒）
+MESSAGE_UNREAD_CACHE_SIZE = int(os.getenv("MESSAGE_UNREAD_CACHE_SIZE", "10000"))
+# 实时推送（SSE）
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_TICKET_EXPIRE_SECONDS = int(os.getenv("SSE_TICKET_EXPIRE_SECONDS", "60"))  # 推送连接票据有效期，票据会出现在 URL 与访问日志中
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "100"))  # 每个连接的待推送事件上限
+
+# Document Configuration
+DOCUMENT_EXCERPT_LENGTH = int(os.getenv("DOCUMENT_EXCERPT_LENGTH", "200"))  # 列表摘要字符数
+DOCUMENT_SNAPSHOT_INTERVAL = int(os.getenv("DOCUMENT_SNAPSHOT_INTERVAL", "20"))  # 每隔多少个版本保存一次完整快照
+DOCUMENT_REVISION_MERGE_SECONDS = int(os.getenv("DOCUMENT_REVISION_MERGE_SECONDS", "120"))  # 同一用户在该时间内的连续保存合并为一个版本，0 表示不合并
+
 # Pagination Configuration
 DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "20"))
 MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100")) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from .database import get_db, engine
+from .database import get_db, get_async_db, get_async_read_db, engine, async_engine, async_read_engine
 from .base import Base
  
-__all__ = ["get_db", "engine", "Base"] 
\ No newline at end of file
+__all__ = ["get_db", "get_async_db", "get_async_read_db", "engine", "async_engine", "async_read_engine", "Base"]
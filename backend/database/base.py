@@ -1,3 +1,14 @@
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
- 
-Base = declarative_base() 
\ No newline at end of file
+from sqlalchemy.sql import functions
+
+Base = declarative_base()
+
+
+@compiles(functions.now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    """
+    SQLite 的 DATETIME 以文本存储并按文本比较排序：CURRENT_TIMESTAMP 不带小数，而 Python 写入的值
+    带 6 位微秒。数据库生成的时间统一补成相同格式，避免同一列混用两种格式导致游标分页错位。
+    """
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
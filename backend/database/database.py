@@ -1,18 +1,130 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from config import (
+    DATABASE_URL,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE,
+    SQLITE_TEMP_STORE,
+    SQLITE_FOREIGN_KEYS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_READ_POOL_SIZE,
+    DB_READ_MAX_OVERFLOW,
+)
 from .base import Base
 
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
+
+def _engine_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    """
+    构建引擎参数：SQLite 需要关闭线程检查；内存库使用单连接池，不支持连接池大小配置
+    """
+    options = {}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_sqlite_memory(url):
+            return options
+    options.update(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """
+    新连接建立时应用 SQLite 性能参数
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        # busy_timeout 需要最先设置，切换 WAL 时也可能需要等待锁
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA temp_store = {SQLITE_TEMP_STORE}")
+        cursor.execute(f"PRAGMA foreign_keys = {'ON' if SQLITE_FOREIGN_KEYS else 'OFF'}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+
+def _register_sqlite_pragmas(sync_engine, read_only: bool = False):
+    if not _is_sqlite(str(sync_engine.url)):
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+
 # 创建数据库引擎
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    **_engine_options(DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW)
 )
+_register_sqlite_pragmas(engine)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def get_async_database_url(url: str) -> str:
+    """
+    将同步数据库URL转换为异步驱动URL（sqlite -> sqlite+aiosqlite）
+    """
+    db_url = make_url(url)
+    if db_url.drivername == "sqlite":
+        db_url = db_url.set(drivername="sqlite+aiosqlite")
+    return db_url.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+# 创建异步数据库引擎
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **_engine_options(ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+)
+_register_sqlite_pragmas(async_engine.sync_engine)
+
+# 只读异步引擎：独立连接池，连接上启用 query_only，供 GET 接口使用
+# 内存库无法跨连接共享数据，直接复用读写引擎
+if _is_sqlite(ASYNC_DATABASE_URL) and _is_sqlite_memory(ASYNC_DATABASE_URL):
+    async_read_engine = async_engine
+else:
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        **_engine_options(ASYNC_DATABASE_URL, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW)
+    )
+    _register_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+
+# 创建异步会话工厂
+# expire_on_commit=False：提交后对象属性仍可访问，避免在事件循环中触发隐式懒加载
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
     """
     获取数据库会话的依赖函数
@@ -24,8 +136,24 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    获取异步数据库会话的依赖函数
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """
+    获取只读异步数据库会话的依赖函数（仅用于不写库的 GET 接口）
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """
     创建所有数据库表
     """
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
@@ -29,6 +29,13 @@ target_metadata = Base.metadata  # 设置为Base.metadata
 # ... etc.
 
 
+def include_name(name, type_, parent_names):
+    """search_index 及其 FTS5 影子表由迁移手写维护，不参与 autogenerate 比较"""
+    if type_ == "table" and name and name.startswith("search_index"):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -47,6 +54,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -73,6 +81,7 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             compare_server_default=True,
             render_as_batch=True,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,144 @@
+"""add subtask table
+
+Revision ID: 3c9a1f4e7b21
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a1f4e7b21'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+subtask_table = sa.table(
+    'subtask',
+    sa.column('task_id', sa.Integer),
+    sa.column('key', sa.String),
+    sa.column('title', sa.String),
+    sa.column('content', sa.Text),
+    sa.column('assignee_id', sa.Integer),
+    sa.column('assignee_name', sa.String),
+    sa.column('position', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'subtask',
+        sa.Column('id', sa.Integer(), nullable=False, comment='主键ID'),
+        sa.Column('task_id', sa.Integer(), nullable=False, comment='所属任务ID'),
+        sa.Column('key', sa.String(length=50), nullable=False, comment='子任务标识，如 s1'),
+        sa.Column('title', sa.String(length=200), nullable=False, comment='子任务标题'),
+        sa.Column('content', sa.Text(), nullable=True, comment='子任务内容'),
+        sa.Column('assignee_id', sa.Integer(), nullable=True, comment='子任务处理人ID'),
+        sa.Column('assignee_name', sa.String(length=50), nullable=True, comment='旧数据中的子任务处理人姓名'),
+        sa.Column('position', sa.Integer(), nullable=False, comment='排序序号'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.ForeignKeyConstraint(['task_id'], ['task.id'], name='fk_subtask_task', ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['assignee_id'], ['user.id'], name='fk_subtask_assignee_user'),
+        sa.PrimaryKeyConstraint('id'),
+        comment='子任务表，记录任务下的子任务、处理人及排序',
+    )
+    op.create_index(op.f('ix_subtask_id'), 'subtask', ['id'], unique=False)
+    op.create_index(op.f('ix_subtask_task_id'), 'subtask', ['task_id'], unique=False)
+    op.create_index(op.f('ix_subtask_assignee_id'), 'subtask', ['assignee_id'], unique=False)
+
+    # 从 task.subtasks JSON 回填子任务
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, subtasks, created_at FROM task WHERE subtasks IS NOT NULL")).fetchall()
+    # 旧数据可能只有处理人姓名：姓名唯一对应一个用户时补上 assignee_id，姓名本身保留在 assignee_name
+    user_ids_by_name = {}
+    for user_id, name in bind.execute(sa.text('SELECT id, name FROM "user" WHERE name IS NOT NULL')):
+        user_ids_by_name.setdefault(name, []).append(user_id)
+    now = datetime.utcnow()
+    subtasks = []
+    for task_id, raw, task_created_at in rows:
+        items = json.loads(raw) if isinstance(raw, str) else raw
+        if not isinstance(items, list):
+            continue
+        used_keys = set()
+        for item in items:
+            if not isinstance(item, dict) or not item.get('title'):
+                continue
+            key = str(item.get('id') or '')
+            if not key or key in used_keys:
+                n = len(used_keys) + 1
+                while f"s{n}" in used_keys:
+                    n += 1
+                key = f"s{n}"
+            used_keys.add(key)
+            created_at = _parse_datetime(item.get('created_at')) or _parse_datetime(task_created_at) or now
+            assignee_name = item.get('assignee') if isinstance(item.get('assignee'), str) else None
+            assignee_id = item.get('assignee_id')
+            if not assignee_id and assignee_name and len(user_ids_by_name.get(assignee_name, [])) == 1:
+                assignee_id = user_ids_by_name[assignee_name][0]
+            subtasks.append({
+                'task_id': task_id,
+                'key': key,
+                'title': item['title'],
+                'content': item.get('content') or '',
+                'assignee_id': assignee_id,
+                'assignee_name': (assignee_name or None) and assignee_name[:50],
+                'position': len(used_keys) - 1,
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+    if subtasks:
+        op.bulk_insert(subtask_table, subtasks)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_column('subtasks')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('subtasks', sa.JSON(), nullable=True, comment='子任务数据，JSON格式存储'))
+
+    # 将子任务写回 task.subtasks JSON
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT task_id, key, title, content, assignee_id, assignee_name, created_at FROM subtask ORDER BY task_id, position"
+    )).fetchall()
+    grouped = {}
+    for task_id, key, title, content, assignee_id, assignee_name, created_at in rows:
+        item = {
+            'id': key,
+            'title': title,
+            'content': content or '',
+            'assignee_id': assignee_id,
+            'created_at': _parse_datetime(created_at).isoformat() if created_at else '',
+        }
+        if assignee_name:
+            item['assignee'] = assignee_name
+        grouped.setdefault(task_id, []).append(item)
+    for task_id, items in grouped.items():
+        bind.execute(
+            sa.text("UPDATE task SET subtasks = :subtasks WHERE id = :id"),
+            {'subtasks': json.dumps(items, ensure_ascii=False), 'id': task_id},
+        )
+
+    op.drop_index(op.f('ix_subtask_assignee_id'), table_name='subtask')
+    op.drop_index(op.f('ix_subtask_task_id'), table_name='subtask')
+    op.drop_index(op.f('ix_subtask_id'), table_name='subtask')
+    op.drop_table('subtask')
@@ -0,0 +1,29 @@
+"""add message_recipient unread index
+
+Revision ID: 5b7e3d9f1a60
+Revises: 8d2e6b0a4c17
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e3d9f1a60'
+down_revision = '8d2e6b0a4c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_message_recipient_unread',
+        'message_recipient',
+        ['recipient_user_id', 'read', 'deleted'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_message_recipient_unread', table_name='message_recipient')
@@ -0,0 +1,41 @@
+"""add project counters
+
+Revision ID: 8d2e6b0a4c17
+Revises: 3c9a1f4e7b21
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e6b0a4c17'
+down_revision = '3c9a1f4e7b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('task_count', sa.Integer(), server_default='0', nullable=False, comment='任务数量'))
+        batch_op.add_column(sa.Column('subtask_count', sa.Integer(), server_default='0', nullable=False, comment='子任务数量'))
+        batch_op.add_column(sa.Column('member_count', sa.Integer(), server_default='0', nullable=False, comment='成员数量'))
+
+    # 回填现有项目的计数
+    op.execute("""
+        UPDATE project SET
+            task_count = (SELECT COUNT(*) FROM task WHERE task.project_id = project.id),
+            subtask_count = (
+                SELECT COUNT(*) FROM subtask JOIN task ON subtask.task_id = task.id
+                WHERE task.project_id = project.id
+            ),
+            member_count = (SELECT COUNT(*) FROM project_membership WHERE project_membership.project_id = project.id)
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_column('member_count')
+        batch_op.drop_column('subtask_count')
+        batch_op.drop_column('task_count')
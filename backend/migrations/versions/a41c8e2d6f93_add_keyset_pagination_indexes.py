@@ -0,0 +1,32 @@
+"""add keyset pagination indexes
+
+Revision ID: a41c8e2d6f93
+Revises: 5b7e3d9f1a60
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c8e2d6f93'
+down_revision = '5b7e3d9f1a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_task_created_at_id', 'task', ['created_at', 'id'], unique=False)
+    op.create_index('ix_project_created_at_id', 'project', ['created_at', 'id'], unique=False)
+    op.create_index('ix_document_created_at_id', 'document', ['created_at', 'id'], unique=False)
+    op.create_index('ix_comment_task_id_created_at_id', 'comment', ['task_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_message_recipient_feed', 'message_recipient', ['recipient_user_id', 'delivered_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_message_recipient_feed', table_name='message_recipient')
+    op.drop_index('ix_comment_task_id_created_at_id', table_name='comment')
+    op.drop_index('ix_document_created_at_id', table_name='document')
+    op.drop_index('ix_project_created_at_id', table_name='project')
+    op.drop_index('ix_task_created_at_id', table_name='task')
@@ -0,0 +1,37 @@
+"""add document content hash
+
+Revision ID: a5d9c3e7f184
+Revises: f3c8a1d6b2e7
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d9c3e7f184'
+down_revision = 'f3c8a1d6b2e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('document', sa.Column('content_hash', sa.String(length=64), nullable=True, comment='正文哈希'))
+
+    # 为已有文档计算正文哈希
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, content FROM document")).fetchall()
+    params = [
+        {'content_hash': hashlib.sha256((content or "").encode("utf-8")).hexdigest(), 'id': document_id}
+        for document_id, content in rows
+    ]
+    if params:
+        bind.execute(sa.text("UPDATE document SET content_hash = :content_hash WHERE id = :id"), params)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,100 @@
+"""add document revision table
+
+Revision ID: b8e2f6a4c391
+Revises: a5d9c3e7f184
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+import hashlib
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2f6a4c391'
+down_revision = 'a5d9c3e7f184'
+branch_labels = None
+depends_on = None
+
+
+document_revision_table = sa.table(
+    'document_revision',
+    sa.column('document_id', sa.Integer),
+    sa.column('revision', sa.Integer),
+    sa.column('base_revision', sa.Integer),
+    sa.column('is_snapshot', sa.Boolean),
+    sa.column('data', sa.LargeBinary),
+    sa.column('title', sa.String),
+    sa.column('content_hash', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('stored_size', sa.Integer),
+    sa.column('author_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+
+document_table = sa.table(
+    'document',
+    sa.column('id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('content', sa.Text),
+    sa.column('author_id', sa.Integer),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'document_revision',
+        sa.Column('id', sa.Integer(), nullable=False, comment='主键ID'),
+        sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+        sa.Column('revision', sa.Integer(), nullable=False, comment='版本号，按文档从 1 递增'),
+        sa.Column('base_revision', sa.Integer(), nullable=False, comment='所在链的快照版本号'),
+        sa.Column('is_snapshot', sa.Boolean(), nullable=False, comment='是否为完整快照'),
+        sa.Column('data', sa.LargeBinary(), nullable=False, comment='zlib 压缩的正文（快照）或差异'),
+        sa.Column('title', sa.String(length=200), nullable=False, comment='该版本的文档标题'),
+        sa.Column('content_hash', sa.String(length=64), nullable=False, comment='该版本正文哈希'),
+        sa.Column('size', sa.Integer(), nullable=False, comment='正文字符数'),
+        sa.Column('stored_size', sa.Integer(), nullable=False, comment='压缩后存储字节数'),
+        sa.Column('author_id', sa.Integer(), nullable=True, comment='保存该版本的用户ID'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id'], name='fk_document_revision_document', ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['author_id'], ['user.id'], name='fk_document_revision_author_user'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_id', 'revision', name='unique_document_revision'),
+        comment='文档版本表，定期保存完整快照，其间保存相对上一版本的压缩差异',
+    )
+
+    # 以当前内容作为每个已有文档的第一个快照版本
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(
+        document_table.c.id,
+        document_table.c.title,
+        document_table.c.content,
+        document_table.c.author_id,
+        document_table.c.updated_at,
+    )).fetchall()
+    revisions = []
+    for document_id, title, content, author_id, updated_at in rows:
+        content = content or ""
+        data = zlib.compress(content.encode("utf-8"), 6)
+        revisions.append({
+            'document_id': document_id,
+            'revision': 1,
+            'base_revision': 1,
+            'is_snapshot': True,
+            'data': data,
+            'title': title,
+            'content_hash': hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            'size': len(content),
+            'stored_size': len(data),
+            'author_id': author_id,
+            'created_at': updated_at,
+        })
+    if revisions:
+        op.bulk_insert(document_revision_table, revisions)
+
+
+def downgrade() -> None:
+    op.drop_table('document_revision')
@@ -0,0 +1,43 @@
+"""add upload blob ref table
+
+Revision ID: c4f7a2d9e615
+Revises: b8e2f6a4c391
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f7a2d9e615'
+down_revision = 'b8e2f6a4c391'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_blob_ref',
+        sa.Column('id', sa.Integer(), nullable=False, comment='主键ID'),
+        sa.Column('sha256', sa.String(length=64), nullable=False, comment='文件内容SHA-256'),
+        sa.Column('user_id', sa.Integer(), nullable=True, comment='上传者用户ID'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='上传时间'),
+        sa.ForeignKeyConstraint(['sha256'], ['upload_blob.sha256'], name='fk_upload_blob_ref_blob'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_upload_blob_ref_user'),
+        sa.PrimaryKeyConstraint('id'),
+        comment='上传文件引用表，每次上传记录一条，只有上传者可以释放自己的引用',
+    )
+    op.create_index('ix_upload_blob_ref_sha256_user_id', 'upload_blob_ref', ['sha256', 'user_id'], unique=False)
+
+    # 已有引用无法确定上传者，按引用计数生成无主引用，文件保持不被删除
+    op.execute(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < (SELECT MAX(ref_count) FROM upload_blob)) "
+        "INSERT INTO upload_blob_ref (sha256, user_id, created_at) "
+        "SELECT upload_blob.sha256, NULL, upload_blob.created_at FROM upload_blob JOIN n ON n.i <= upload_blob.ref_count"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_upload_blob_ref_sha256_user_id', table_name='upload_blob_ref')
+    op.drop_table('upload_blob_ref')
@@ -0,0 +1,34 @@
+"""add upload blob table
+
+Revision ID: c62f0b9e3d18
+Revises: a41c8e2d6f93
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c62f0b9e3d18'
+down_revision = 'a41c8e2d6f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_blob',
+        sa.Column('sha256', sa.String(length=64), nullable=False, comment='文件内容SHA-256'),
+        sa.Column('ext', sa.String(length=20), nullable=False, comment='文件扩展名'),
+        sa.Column('content_type', sa.String(length=100), nullable=True, comment='MIME类型'),
+        sa.Column('size', sa.Integer(), nullable=False, comment='文件大小（字节）'),
+        sa.Column('ref_count', sa.Integer(), nullable=False, comment='引用计数，为0时删除文件'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.PrimaryKeyConstraint('sha256'),
+        comment='上传文件内容寻址存储，按 SHA-256 去重并记录引用计数',
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('upload_blob')
@@ -0,0 +1,66 @@
+"""add document share table
+
+Revision ID: d7a3e5c1b940
+Revises: c62f0b9e3d18
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3e5c1b940'
+down_revision = 'c62f0b9e3d18'
+branch_labels = None
+depends_on = None
+
+
+document_share_table = sa.table(
+    'document_share',
+    sa.column('document_id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'document_share',
+        sa.Column('id', sa.Integer(), nullable=False, comment='主键ID'),
+        sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='可见用户ID'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='共享时间'),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id'], name='fk_document_share_document', ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_document_share_user', ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_id', 'user_id', name='unique_document_user'),
+        comment='文档共享表，记录文档指定可见的用户',
+    )
+    op.create_index('ix_document_share_user_id_document_id', 'document_share', ['user_id', 'document_id'], unique=False)
+    op.create_index('ix_document_author_id', 'document', ['author_id'], unique=False)
+    op.create_index('ix_document_project_id', 'document', ['project_id'], unique=False)
+    op.create_index('ix_project_membership_user_id_project_id', 'project_membership', ['user_id', 'project_id'], unique=False)
+
+    # 从 document.specific_user_ids JSON 回填共享记录
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, specific_user_ids FROM document WHERE specific_user_ids IS NOT NULL")).fetchall()
+    shares = []
+    for document_id, raw in rows:
+        user_ids = json.loads(raw) if isinstance(raw, str) else raw
+        if not isinstance(user_ids, list):
+            continue
+        for user_id in dict.fromkeys(user_ids):
+            if isinstance(user_id, int):
+                shares.append({'document_id': document_id, 'user_id': user_id})
+    if shares:
+        op.bulk_insert(document_share_table, shares)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_project_membership_user_id_project_id', table_name='project_membership')
+    op.drop_index('ix_document_project_id', table_name='document')
+    op.drop_index('ix_document_author_id', table_name='document')
+    op.drop_index('ix_document_share_user_id_document_id', table_name='document_share')
+    op.drop_table('document_share')
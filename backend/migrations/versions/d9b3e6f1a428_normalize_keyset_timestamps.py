@@ -0,0 +1,54 @@
+"""normalize keyset timestamps
+
+Revision ID: d9b3e6f1a428
+Revises: c4f7a2d9e615
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b3e6f1a428'
+down_revision = 'c4f7a2d9e615'
+branch_labels = None
+depends_on = None
+
+
+# 游标分页使用的时间列：CURRENT_TIMESTAMP 等写入的值不带小数，统一为与 Python 写入一致的 6 位微秒格式
+KEYSET_COLUMNS = [
+    ('task', 'created_at'),
+    ('project', 'created_at'),
+    ('document', 'created_at'),
+    ('comment', 'created_at'),
+    ('message_recipient', 'delivered_at'),
+]
+
+
+# 以 now() 为数据库默认值的列，默认值改为与应用相同的格式
+SERVER_DEFAULT_COLUMNS = [
+    ('message', 'created_at'),
+    ('message_recipient', 'delivered_at'),
+]
+NOW_WITH_MICROSECONDS = sa.text("(strftime('%Y-%m-%d %H:%M:%f000', 'now'))")
+
+
+def upgrade() -> None:
+    for table, column in SERVER_DEFAULT_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.DateTime(), server_default=NOW_WITH_MICROSECONDS)
+
+    for table, column in KEYSET_COLUMNS:
+        normalized = f"strftime('%Y-%m-%d %H:%M:%f000', {column})"
+        # 已是 6 位微秒格式的值保持不变（strftime 只保留到毫秒），无法解析的值同样跳过
+        op.execute(sa.text(
+            f"UPDATE {table} SET {column} = {normalized} WHERE length({column}) != 26 AND {normalized} IS NOT NULL"
+        ))
+
+
+def downgrade() -> None:
+    for table, column in SERVER_DEFAULT_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'))
+    # 已写入的时间两种格式读取结果相同，无需还原
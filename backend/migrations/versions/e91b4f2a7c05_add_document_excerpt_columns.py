@@ -0,0 +1,72 @@
+"""add document excerpt columns
+
+Revision ID: e91b4f2a7c05
+Revises: d7a3e5c1b940
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b4f2a7c05'
+down_revision = 'd7a3e5c1b940'
+branch_labels = None
+depends_on = None
+
+
+# 摘要生成逻辑按本次迁移时的实现复制，避免应用代码后续修改影响历史迁移
+EXCERPT_LENGTH = 200
+
+_CODE_FENCE_RE = re.compile(r"```.*?```|~~~.*?~~~", re.S)
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_LINE_MARK_RE = re.compile(r"^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+(\[[ xX]\]\s+)?|\d+[.)]\s+)", re.M)
+_INLINE_MARK_RE = re.compile(r"(\*\*|__|~~|`|\*|_)")
+_TABLE_RULE_RE = re.compile(r"^\s*\|?\s*:?-{3,}.*$|^\s*([-*_]\s*){3,}$", re.M)
+_WHITESPACE_RE = re.compile(r"\s+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af]")
+_WORD_RE = re.compile(r"[A-Za-z0-9]+(?:['’.-][A-Za-z0-9]+)*")
+
+
+def _summarize(content):
+    text = _CODE_FENCE_RE.sub(" ", content or "")
+    text = _IMAGE_RE.sub(r"\1", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = _TABLE_RULE_RE.sub(" ", text)
+    text = _LINE_MARK_RE.sub("", text)
+    text = _INLINE_MARK_RE.sub("", text)
+    text = text.replace("|", " ")
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    excerpt = text if len(text) <= EXCERPT_LENGTH else text[:EXCERPT_LENGTH].rstrip() + "…"
+    word_count = len(_CJK_RE.findall(text)) + len(_WORD_RE.findall(_CJK_RE.sub(" ", text)))
+    return excerpt, word_count
+
+
+def upgrade() -> None:
+    op.add_column('document', sa.Column('excerpt', sa.String(length=300), nullable=True, comment='纯文本摘要'))
+    op.add_column('document', sa.Column('word_count', sa.Integer(), server_default='0', nullable=False, comment='字数'))
+
+    # 为已有文档生成摘要与字数
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, content FROM document")).fetchall()
+    params = []
+    for document_id, content in rows:
+        excerpt, word_count = _summarize(content)
+        params.append({'excerpt': excerpt, 'word_count': word_count, 'id': document_id})
+    if params:
+        bind.execute(
+            sa.text("UPDATE document SET excerpt = :excerpt, word_count = :word_count WHERE id = :id"),
+            params,
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.drop_column('word_count')
+        batch_op.drop_column('excerpt')
@@ -0,0 +1,116 @@
+"""add search index
+
+Revision ID: f3c8a1d6b2e7
+Revises: e91b4f2a7c05
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a1d6b2e7'
+down_revision = 'e91b4f2a7c05'
+branch_labels = None
+depends_on = None
+
+
+# 建表、触发器与回填语句按本次迁移时的结构固定下来，不引用模型代码
+SEARCH_INDEX_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(title, body, parent_id UNINDEXED, tokenize = 'trigram')",
+    """CREATE TRIGGER IF NOT EXISTS search_index_document_ai AFTER INSERT ON "document" BEGIN
+        INSERT INTO search_index(rowid, title, body, parent_id)
+        VALUES (new.id * 8 + 1, new.title, new.content, NULL);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_document_au AFTER UPDATE OF title, content ON "document" BEGIN
+        UPDATE search_index SET title = new.title, body = new.content, parent_id = NULL
+        WHERE rowid = new.id * 8 + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_document_ad AFTER DELETE ON "document" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 8 + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_task_ai AFTER INSERT ON "task" BEGIN
+        INSERT INTO search_index(rowid, title, body, parent_id)
+        VALUES (new.id * 8 + 2, new.title, new.content, NULL);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_task_au AFTER UPDATE OF title, content ON "task" BEGIN
+        UPDATE search_index SET title = new.title, body = new.content, parent_id = NULL
+        WHERE rowid = new.id * 8 + 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_task_ad AFTER DELETE ON "task" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 8 + 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_subtask_ai AFTER INSERT ON "subtask" BEGIN
+        INSERT INTO search_index(rowid, title, body, parent_id)
+        VALUES (new.id * 8 + 3, new.title, new.content, new.task_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_subtask_au AFTER UPDATE OF title, content, task_id ON "subtask" BEGIN
+        UPDATE search_index SET title = new.title, body = new.content, parent_id = new.task_id
+        WHERE rowid = new.id * 8 + 3;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_subtask_ad AFTER DELETE ON "subtask" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 8 + 3;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_comment_ai AFTER INSERT ON "comment" BEGIN
+        INSERT INTO search_index(rowid, title, body, parent_id)
+        VALUES (new.id * 8 + 4, '', new.content, new.task_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_comment_au AFTER UPDATE OF content, task_id ON "comment" BEGIN
+        UPDATE search_index SET title = '', body = new.content, parent_id = new.task_id
+        WHERE rowid = new.id * 8 + 4;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_comment_ad AFTER DELETE ON "comment" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 8 + 4;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_document_comment_ai AFTER INSERT ON "document_comment" BEGIN
+        INSERT INTO search_index(rowid, title, body, parent_id)
+        VALUES (new.id * 8 + 5, '', new.content, new.document_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_document_comment_au AFTER UPDATE OF content, document_id ON "document_comment" BEGIN
+        UPDATE search_index SET title = '', body = new.content, parent_id = new.document_id
+        WHERE rowid = new.id * 8 + 5;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_index_document_comment_ad AFTER DELETE ON "document_comment" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 8 + 5;
+    END""",
+]
+
+SEARCH_INDEX_BACKFILL = [
+    "INSERT INTO search_index(rowid, title, body, parent_id) SELECT id * 8 + 1, document.title, document.content, NULL FROM document",
+    "INSERT INTO search_index(rowid, title, body, parent_id) SELECT id * 8 + 2, task.title, task.content, NULL FROM task",
+    "INSERT INTO search_index(rowid, title, body, parent_id) SELECT id * 8 + 3, subtask.title, subtask.content, subtask.task_id FROM subtask",
+    "INSERT INTO search_index(rowid, title, body, parent_id) SELECT id * 8 + 4, '', comment.content, comment.task_id FROM comment",
+    "INSERT INTO search_index(rowid, title, body, parent_id) SELECT id * 8 + 5, '', document_comment.content, document_comment.document_id FROM document_comment",
+]
+
+SEARCH_INDEX_DROP = [
+    "DROP TRIGGER IF EXISTS search_index_document_ai",
+    "DROP TRIGGER IF EXISTS search_index_document_au",
+    "DROP TRIGGER IF EXISTS search_index_document_ad",
+    "DROP TRIGGER IF EXISTS search_index_task_ai",
+    "DROP TRIGGER IF EXISTS search_index_task_au",
+    "DROP TRIGGER IF EXISTS search_index_task_ad",
+    "DROP TRIGGER IF EXISTS search_index_subtask_ai",
+    "DROP TRIGGER IF EXISTS search_index_subtask_au",
+    "DROP TRIGGER IF EXISTS search_index_subtask_ad",
+    "DROP TRIGGER IF EXISTS search_index_comment_ai",
+    "DROP TRIGGER IF EXISTS search_index_comment_au",
+    "DROP TRIGGER IF EXISTS search_index_comment_ad",
+    "DROP TRIGGER IF EXISTS search_index_document_comment_ai",
+    "DROP TRIGGER IF EXISTS search_index_document_comment_au",
+    "DROP TRIGGER IF EXISTS search_index_document_comment_ad",
+    "DROP TABLE IF EXISTS search_index",
+]
+
+
+def upgrade() -> None:
+    for stmt in SEARCH_INDEX_CREATE:
+        op.execute(stmt)
+    # 为已有数据建立索引
+    for stmt in SEARCH_INDEX_BACKFILL:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    for stmt in SEARCH_INDEX_DROP:
+        op.execute(stmt)
@@ -1,20 +1,30 @@
 from .user import User
 from .project import Project
 from .task import Task
+from .subtask import Subtask
 from .comment import Comment
 from .project_membership import ProjectMembership
 from .document import Document
 from .document_comment import DocumentComment
+from .document_share import DocumentShare
+from .document_revision import DocumentRevision
 from .message import Message, MessageRecipient
+from .upload_blob import UploadBlob, UploadBlobRef
+from . import search_index  # 注册全文索引的建表语句
 
 __all__ = [
     "User",
     "Project", 
     "Task",
+    "Subtask",
     "Comment",
     "ProjectMembership",
     "Document",
     "DocumentComment",
+    "DocumentShare",
+    "DocumentRevision",
     "Message",
     "MessageRecipient",
+    "UploadBlob",
+    "UploadBlobRef",
 ] 
\ No newline at end of file
@@ -1,11 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.base import Base
 
 class Comment(Base):
     __tablename__ = "comment"
-    __table_args__ = {'comment': '评论表，记录任务和日志的评论内容及关联关系'}
+    __table_args__ = (
+        # 任务评论游标分页：按任务过滤后 (created_at, id) 倒序
+        Index('ix_comment_task_id_created_at_id', 'task_id', 'created_at', 'id'),
+        {'comment': '评论表，记录任务和日志的评论内容及关联关系'},
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="主键ID")
     content = Column(Text, nullable=False, comment="评论内容(Markdown格式)")
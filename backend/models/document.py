@@ -1,17 +1,30 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.base import Base
 
 class Document(Base):
     __tablename__ = "document"
-    __table_args__ = {'comment': '文档表，记录用户创建的文档及可见性'}
+    __table_args__ = (
+        # 列表游标分页：按 (created_at, id) 倒序
+        Index('ix_document_created_at_id', 'created_at', 'id'),
+        # 可见性查询：按作者、按项目查找文档
+        Index('ix_document_author_id', 'author_id'),
+        Index('ix_document_project_id', 'project_id'),
+        {'comment': '文档表，记录用户创建的文档及可见性'},
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="主键ID")
     title = Column(String(200), nullable=False, comment="文档标题")
     content = Column(Text, nullable=False, comment="文档内容(Markdown)")
+    # 正文的 SHA-256，增量修改时用于校验客户端的基准版本
+    content_hash = Column(String(64), nullable=True, comment="正文哈希")
+    # 写入时生成，列表页只读取摘要，不加载全文
+    excerpt = Column(String(300), nullable=True, comment="纯文本摘要")
+    word_count = Column(Integer, nullable=False, default=0, server_default="0", comment="字数")
     project_id = Column(Integer, ForeignKey("project.id", name="fk_document_project"), nullable=True, comment="所属项目ID，为空表示不属于任何项目")
-    specific_user_ids = Column(JSON, nullable=True, comment="指定可见用户ID列表，为空表示所有用户可见")
+    # 指定可见用户，仅用于响应展示；可见性查询使用 document_share 表
+    specific_user_ids = Column(JSON, nullable=True, comment="指定可见用户ID列表，与 document_share 表保持一致")
     author_id = Column(Integer, ForeignKey("user.id", name="fk_document_author_user"), nullable=False, comment="作者用户ID")
     created_at = Column(DateTime, default=func.now(), comment="创建时间")
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), comment="更新时间")
@@ -19,6 +32,7 @@ class Document(Base):
     author = relationship("User", back_populates="documents", lazy="joined")
     project = relationship("Project", back_populates="documents", lazy="joined")
     comments = relationship("DocumentComment", back_populates="document", cascade="all, delete-orphan")
+    shares = relationship("DocumentShare", back_populates="document", cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f"<Document(id={self.id}, title='{self.title}', author_id={self.author_id})>" 
\ No newline at end of file
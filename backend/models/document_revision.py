@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, LargeBinary, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from database.base import Base
+
+class DocumentRevision(Base):
+    __tablename__ = "document_revision"
+    __table_args__ = (
+        # 按文档倒序列出版本、定位最新版本与快照链
+        UniqueConstraint('document_id', 'revision', name='unique_document_revision'),
+        {'comment': '文档版本表，定期保存完整快照，其间保存相对上一版本的压缩差异'}
+    )
+
+    id = Column(Integer, primary_key=True, comment="主键ID")
+    document_id = Column(Integer, ForeignKey("document.id", name="fk_document_revision_document", ondelete="CASCADE"), nullable=False, comment="文档ID")
+    revision = Column(Integer, nullable=False, comment="版本号，按文档从 1 递增")
+    # 快照的 base_revision 等于自身版本号；差异版本指向所在链的快照，重建时从该快照依次应用差异
+    base_revision = Column(Integer, nullable=False, comment="所在链的快照版本号")
+    is_snapshot = Column(Boolean, nullable=False, default=False, comment="是否为完整快照")
+    data = Column(LargeBinary, nullable=False, comment="zlib 压缩的正文（快照）或差异")
+    title = Column(String(200), nullable=False, comment="该版本的文档标题")
+    content_hash = Column(String(64), nullable=False, comment="该版本正文哈希")
+    size = Column(Integer, nullable=False, comment="正文字符数")
+    stored_size = Column(Integer, nullable=False, comment="压缩后存储字节数")
+    author_id = Column(Integer, ForeignKey("user.id", name="fk_document_revision_author_user"), nullable=True, comment="保存该版本的用户ID")
+    created_at = Column(DateTime, default=func.now(), comment="创建时间")
+
+    def __repr__(self):
+        return f"<DocumentRevision(document_id={self.document_id}, revision={self.revision}, is_snapshot={self.is_snapshot})>"
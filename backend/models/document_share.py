@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database.base import Base
+
+class DocumentShare(Base):
+    __tablename__ = "document_share"
+    __table_args__ = (
+        UniqueConstraint('document_id', 'user_id', name='unique_document_user'),
+        # 按用户查找被共享的文档
+        Index('ix_document_share_user_id_document_id', 'user_id', 'document_id'),
+        {'comment': '文档共享表，记录文档指定可见的用户'}
+    )
+
+    id = Column(Integer, primary_key=True, comment="主键ID")
+    document_id = Column(Integer, ForeignKey("document.id", name="fk_document_share_document", ondelete="CASCADE"), nullable=False, comment="文档ID")
+    user_id = Column(Integer, ForeignKey("user.id", name="fk_document_share_user", ondelete="CASCADE"), nullable=False, comment="可见用户ID")
+    created_at = Column(DateTime, default=func.now(), comment="共享时间")
+
+    document = relationship("Document", back_populates="shares")
+
+    def __repr__(self):
+        return f"<DocumentShare(document_id={self.document_id}, user_id={self.user_id})>"
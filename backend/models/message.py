@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.base import Base
@@ -41,7 +41,13 @@ class Message(Base):
 
 class MessageRecipient(Base):
     __tablename__ = "message_recipient"
-    __table_args__ = {"comment": "消息接收关系表，记录每个接收人的投递与已读状态"}
+    __table_args__ = (
+        # 未读计数：按接收人 + 已读 + 删除状态覆盖 COUNT 查询
+        Index("ix_message_recipient_unread", "recipient_user_id", "read", "deleted"),
+        # 通知列表游标分页：按接收人过滤后 (delivered_at, id) 倒序
+        Index("ix_message_recipient_feed", "recipient_user_id", "delivered_at", "id"),
+        {"comment": "消息接收关系表，记录每个接收人的投递与已读状态"},
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="主键ID")
 
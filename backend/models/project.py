@@ -1,17 +1,27 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.base import Base
 
 class Project(Base):
     __tablename__ = "project"
-    __table_args__ = {'comment': '项目表，存储协作项目的基本信息'}
+    __table_args__ = (
+        # 列表游标分页：按 (created_at, id) 倒序
+        Index('ix_project_created_at_id', 'created_at', 'id'),
+        {'comment': '项目表，存储协作项目的基本信息'},
+    )
     
     id = Column(Integer, primary_key=True, index=True, comment="主键ID")
     name = Column(String(255), nullable=False, index=True, comment="项目名称")
     description = Column(Text, nullable=True, comment="项目描述")
     status = Column(String(50), default="active", index=True, comment="项目状态: active(活跃), archived(已归档)")
     created_by = Column(Integer, ForeignKey("user.id", name="fk_project_created_by_user"), nullable=False, comment="创建者用户ID")
+    
+    # 统计计数（由任务、成员变更在同一事务内增量维护）
+    task_count = Column(Integer, nullable=False, default=0, server_default="0", comment="任务数量")
+    subtask_count = Column(Integer, nullable=False, default=0, server_default="0", comment="子任务数量")
+    member_count = Column(Integer, nullable=False, default=0, server_default="0", comment="成员数量")
+    
     created_at = Column(DateTime, default=func.now(), comment="创建时间")
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), comment="更新时间")
     
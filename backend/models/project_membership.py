@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.base import Base
@@ -7,6 +7,8 @@ class ProjectMembership(Base):
     __tablename__ = "project_membership"
     __table_args__ = (
         UniqueConstraint('project_id', 'user_id', name='unique_project_user'),
+        # 按用户查找所在项目
+        Index('ix_project_membership_user_id_project_id', 'user_id', 'project_id'),
         {'comment': '项目成员表，记录用户在项目中的角色和加入时间'}
     )
 
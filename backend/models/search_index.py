@@ -0,0 +1,86 @@
+"""
+全文搜索索引（SQLite FTS5）
+
+文档、任务、子任务、任务评论、文档评论共用一张 FTS5 虚拟表 search_index，
+rowid 编码为 实体ID * 8 + 实体类型，由各源表上的触发器增量维护。
+使用 trigram 分词器，中文无需分词即可检索（查询词至少 3 个字符时走索引）。
+"""
+from sqlalchemy import DDL, event, table, column, Integer, Text
+from database.base import Base
+
+# 实体类型编码，占 rowid 低 3 位
+SEARCH_KINDS = {
+    "document": 1,
+    "task": 2,
+    "subtask": 3,
+    "comment": 4,
+    "document_comment": 5,
+}
+SEARCH_KIND_BITS = 8
+
+search_index = table(
+    "search_index",
+    column("rowid", Integer),
+    column("title", Text),
+    column("body", Text),
+    column("parent_id", Integer),
+)
+
+# (实体类型/源表, 标题列, 正文列, 父级ID列)；评论没有标题
+_SOURCES = [
+    ("document", "title", "content", None),
+    ("task", "title", "content", None),
+    ("subtask", "title", "content", "task_id"),
+    ("comment", None, "content", "task_id"),
+    ("document_comment", None, "content", "document_id"),
+]
+
+
+def _values(row: str, title, body, parent) -> str:
+    title_expr = f"{row}.{title}" if title else "''"
+    parent_expr = f"{row}.{parent}" if parent else "NULL"
+    return f"{title_expr}, {row}.{body}, {parent_expr}"
+
+
+def _trigger_statements(source: str, title, body, parent):
+    rowid = f"* {SEARCH_KIND_BITS} + {SEARCH_KINDS[source]}"
+    watched = ", ".join(c for c in (title, body, parent) if c)
+    title_expr, body_expr, parent_expr = _values("new", title, body, parent).split(", ")
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS search_index_{source}_ai AFTER INSERT ON "{source}" BEGIN
+            INSERT INTO search_index(rowid, title, body, parent_id)
+            VALUES (new.id {rowid}, {_values("new", title, body, parent)});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS search_index_{source}_au AFTER UPDATE OF {watched} ON "{source}" BEGIN
+            UPDATE search_index SET title = {title_expr}, body = {body_expr}, parent_id = {parent_expr}
+            WHERE rowid = new.id {rowid};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS search_index_{source}_ad AFTER DELETE ON "{source}" BEGIN
+            DELETE FROM search_index WHERE rowid = old.id {rowid};
+        END""",
+    ]
+
+
+SEARCH_INDEX_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, parent_id UNINDEXED, tokenize = 'trigram')",
+] + [stmt for source in _SOURCES for stmt in _trigger_statements(*source)]
+
+SEARCH_INDEX_BACKFILL = [
+    f"INSERT INTO search_index(rowid, title, body, parent_id) "
+    f"SELECT id * {SEARCH_KIND_BITS} + {SEARCH_KINDS[source]}, "
+    f"{_values(source, title, body, parent)} FROM {source}"
+    for source, title, body, parent in _SOURCES
+]
+
+SEARCH_INDEX_DROP = [
+    f"DROP TRIGGER IF EXISTS search_index_{source}_{suffix}"
+    for source, _, _, _ in _SOURCES
+    for suffix in ("ai", "au", "ad")
+] + ["DROP TABLE IF EXISTS search_index"]
+
+# create_all 建表后同时创建索引与触发器（迁移中使用相同语句）
+for _stmt in SEARCH_INDEX_CREATE:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in SEARCH_INDEX_DROP:
+    event.listen(Base.metadata, "before_drop", DDL(_stmt).execute_if(dialect="sqlite"))
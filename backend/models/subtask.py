@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database.base import Base
+
+class Subtask(Base):
+    __tablename__ = "subtask"
+    __table_args__ = {'comment': '子任务表，记录任务下的子任务、处理人及排序'}
+
+    id = Column(Integer, primary_key=True, index=True, comment="主键ID")
+    task_id = Column(Integer, ForeignKey("task.id", name="fk_subtask_task", ondelete="CASCADE"), nullable=False, index=True, comment="所属任务ID")
+
+    # 对外暴露的子任务标识（如 s1），与原 JSON 数据保持兼容
+    key = Column(String(50), nullable=False, comment="子任务标识，如 s1")
+    title = Column(String(200), nullable=False, comment="子任务标题")
+    content = Column(Text, nullable=True, comment="子任务内容")
+
+    # 子任务处理人
+    assignee_id = Column(Integer, ForeignKey("user.id", name="fk_subtask_assignee_user"), nullable=True, index=True, comment="子任务处理人ID")
+    # 迁移前 JSON 中只记录了姓名的处理人，处理人变更后清空
+    assignee_name = Column(String(50), nullable=True, comment="旧数据中的子任务处理人姓名")
+
+    # 排序
+    position = Column(Integer, nullable=False, default=0, comment="排序序号")
+
+    # 时间戳
+    created_at = Column(DateTime, default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    # 关系
+    task = relationship("Task", back_populates="subtasks")
+    assignee = relationship("User", back_populates="assigned_subtasks")
+
+    def __repr__(self):
+        return f"<Subtask(id={self.id}, task_id={self.task_id}, key='{self.key}')>"
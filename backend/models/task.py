@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -11,7 +11,11 @@ class TaskPriority(str, enum.Enum):
 
 class Task(Base):
     __tablename__ = "task"
-    __table_args__ = {'comment': '任务表，记录项目任务、分配、优先级等信息'}
+    __table_args__ = (
+        # 列表游标分页：按 (created_at, id) 倒序
+        Index('ix_task_created_at_id', 'created_at', 'id'),
+        {'comment': '任务表，记录项目任务、分配、优先级等信息'},
+    )
 
     id = Column(Integer, primary_key=True, index=True, comment="主键ID")
     title = Column(String(200), nullable=False, comment="任务标题")
@@ -20,9 +24,6 @@ class Task(Base):
     # 优先级
     priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM, nullable=False, comment="优先级: low(低), medium(中), high(高)")
     
-    # 子任务数据（JSON格式）
-    subtasks = Column(JSON, nullable=True, comment="子任务数据，JSON格式存储")
-    
     # 外键
     project_id = Column(Integer, ForeignKey("project.id", name="fk_task_project_id"), nullable=True, comment="所属项目ID")
     creator_id = Column(Integer, ForeignKey("user.id", name="fk_task_creator_id"), nullable=False, comment="创建者用户ID")
@@ -39,6 +40,12 @@ class Task(Base):
     creator = relationship("User", foreign_keys=[creator_id], back_populates="created_tasks")
     assignee = relationship("User", foreign_keys=[assignee_id], back_populates="assigned_tasks")
     comments = relationship("Comment", back_populates="task")
+    subtasks = relationship(
+        "Subtask",
+        back_populates="task",
+        order_by="Subtask.position",
+        cascade="all, delete-orphan",
+    )
 
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}', priority='{self.priority}')>" 
\ No newline at end of file
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from database.base import Base
+
+class UploadBlob(Base):
+    __tablename__ = "upload_blob"
+    __table_args__ = {'comment': '上传文件内容寻址存储，按 SHA-256 去重并记录引用计数'}
+
+    sha256 = Column(String(64), primary_key=True, comment="文件内容SHA-256")
+    ext = Column(String(20), nullable=False, default="", comment="文件扩展名")
+    content_type = Column(String(100), nullable=True, comment="MIME类型")
+    size = Column(Integer, nullable=False, comment="文件大小（字节）")
+    # 与 upload_blob_ref 的记录数保持一致，归零时删除文件
+    ref_count = Column(Integer, nullable=False, default=1, comment="引用计数，为0时删除文件")
+    created_at = Column(DateTime, default=func.now(), comment="创建时间")
+
+    def __repr__(self):
+        return f"<UploadBlob(sha256='{self.sha256}', ref_count={self.ref_count})>"
+
+
+class UploadBlobRef(Base):
+    __tablename__ = "upload_blob_ref"
+    __table_args__ = (
+        # 删除时按 (文件, 上传者) 查找该用户持有的引用
+        Index('ix_upload_blob_ref_sha256_user_id', 'sha256', 'user_id'),
+        {'comment': '上传文件引用表，每次上传记录一条，只有上传者可以释放自己的引用'}
+    )
+
+    id = Column(Integer, primary_key=True, comment="主键ID")
+    sha256 = Column(String(64), ForeignKey("upload_blob.sha256", name="fk_upload_blob_ref_blob"), nullable=False, comment="文件内容SHA-256")
+    # 引用表创建前的历史引用没有上传者记录，为空且不可被释放
+    user_id = Column(Integer, ForeignKey("user.id", name="fk_upload_blob_ref_user"), nullable=True, comment="上传者用户ID")
+    created_at = Column(DateTime, default=func.now(), comment="上传时间")
+
+    def __repr__(self):
+        return f"<UploadBlobRef(sha256='{self.sha256}', user_id={self.user_id})>"
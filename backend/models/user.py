@@ -36,6 +36,7 @@ class User(Base):
     project_membership = relationship("ProjectMembership", back_populates="user")
     assigned_tasks = relationship("Task", foreign_keys="Task.assignee_id", back_populates="assignee")
     created_tasks = relationship("Task", foreign_keys="Task.creator_id", back_populates="creator")
+    assigned_subtasks = relationship("Subtask", back_populates="assignee")
     comments = relationship("Comment", back_populates="author")
     documents = relationship("Document", back_populates="author", cascade="all, delete-orphan")
     document_comments = relationship("DocumentComment", back_populates="author")
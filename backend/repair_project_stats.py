@@ -0,0 +1,24 @@
+"""
+重新计算项目统计计数（task_count / subtask_count / member_count）。
+
+用法：
+    uv run python repair_project_stats.py            # 重算所有项目
+    uv run python repair_project_stats.py 1 2 3      # 只重算指定项目
+"""
+import asyncio
+import sys
+import api  # noqa: F401  先加载 api 包，避免 services 与 api 之间的循环导入
+from database.database import AsyncSessionLocal
+from services.project_service import ProjectService
+
+
+async def main():
+    project_ids = [int(arg) for arg in sys.argv[1:]] or None
+    async with AsyncSessionLocal() as db:
+        count = await ProjectService(db).recompute_project_counters(project_ids)
+        await db.commit()
+        print(f"已重算 {count} 个项目的统计计数")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,13 +3,15 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, SSE_TICKET_EXPIRE_SECONDS
 from models.user import User
 from api.schemas.user import UserStatus
 import logging
 
 logger = logging.getLogger(__name__)
 
+STREAM_TICKET_SCOPE = "stream"
+
 
 class AuthService:
     def __init__(self):
@@ -28,6 +30,16 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
 
+    def create_stream_ticket(self, user_id: int) -> str:
+        """
+        创建推送连接（SSE）票据：EventSource 只能通过 URL 传递凭据，
+        因此只签发带 scope 限定的短期令牌，不能用于其他接口
+        """
+        return self.create_access_token(
+            data={"sub": str(user_id), "scope": STREAM_TICKET_SCOPE},
+            expires_delta=timedelta(seconds=SSE_TICKET_EXPIRE_SECONDS),
+        )
+
     def get_user_by_openid(self, db: Session, openid: str) -> Optional[User]:
         """通过 openid 获取用户"""
         return db.query(User).filter(User.openid == openid).first()
@@ -53,7 +65,8 @@ class AuthService:
         try:
             payload = jwt.decode(refresh_token, self.secret_key, algorithms=[self.algorithm])
             user_id: str = payload.get("sub")
-            if user_id is None:
+            # 限定用途的票据（如推送连接票据）不能换取访问令牌
+            if user_id is None or payload.get("scope"):
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="无效的刷新令牌",
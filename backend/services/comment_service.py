@@ -1,16 +1,19 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from fastapi import HTTPException, status
 from api.schemas.comment import CommentCreate, CommentUpdate, CommentResponse
 from models.comment import Comment
 from models.task import Task
 from models.user import User
+from services.pagination import keyset_before, split_page
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CommentService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     def _get_comment_response(self, comment: Comment) -> CommentResponse:
@@ -25,12 +28,19 @@ class CommentService:
             updated_at=comment.updated_at
         )
 
+    async def _get_comment_with_author(self, comment_id: int) -> Optional[Comment]:
+        """查询评论并预加载作者（异步会话不支持懒加载）"""
+        stmt = select(Comment).options(joinedload(Comment.author)).where(
+            Comment.id == comment_id
+        ).execution_options(populate_existing=True)
+        return await self.db.scalar(stmt)
+
     async def create_comment(self, comment: CommentCreate, author_id: int) -> CommentResponse:
         """创建评论"""
         try:
             # 验证任务是否存在（如果提供了任务ID）
             if comment.task_id:
-                task = self.db.query(Task).filter(Task.id == comment.task_id).first()
+                task = await self.db.get(Task, comment.task_id)
                 if not task:
                     raise HTTPException(
                         status_code=status.HTTP_404_NOT_FOUND,
@@ -45,13 +55,10 @@ class CommentService:
             )
             
             self.db.add(new_comment)
-            self.db.commit()
-            self.db.refresh(new_comment)
+            await self.db.commit()
             
             # 重新查询以获取作者信息
-            comment_with_author = self.db.query(Comment).options(
-                joinedload(Comment.author)
-            ).filter(Comment.id == new_comment.id).first()
+            comment_with_author = await self._get_comment_with_author(new_comment.id)
             
             return self._get_comment_response(comment_with_author)
             
@@ -59,7 +66,7 @@ class CommentService:
             raise
         except Exception as e:
             logger.error(f"创建评论失败: {e}")
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="创建评论失败"
@@ -70,22 +77,35 @@ class CommentService:
         user_id: int,
         skip: int = 0,
         limit: int = 20,
-        task_id: Optional[int] = None
-    ) -> List[CommentResponse]:
-        """获取评论列表"""
+        task_id: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[CommentResponse], Optional[str]]:
+        """获取评论列表，返回 (当前页评论, 下一页游标)"""
         try:
-            query = self.db.query(Comment).options(joinedload(Comment.author))
+            stmt = select(Comment).options(joinedload(Comment.author))
             
             # 根据过滤条件筛选
             if task_id is not None:
-                query = query.filter(Comment.task_id == task_id)
-            
-            # 按创建时间倒序排列
-            comments = query.order_by(Comment.created_at.desc()).offset(skip).limit(limit).all()
+                stmt = stmt.where(Comment.task_id == task_id)
+            
+            # 按创建时间倒序排列，传入游标时从游标位置继续
+            stmt = stmt.order_by(Comment.created_at.desc(), Comment.id.desc())
+            after = keyset_before(Comment.created_at, Comment.id, cursor)
+            if after is not None:
+                stmt = stmt.where(after)
+            else:
+                stmt = stmt.offset(skip)
+            comments = (await self.db.execute(stmt.limit(limit + 1))).scalars().all()
+            comments, next_cursor = split_page(comments, limit, lambda c: (c.created_at, c.id))
             
             # 转换为响应模型列表
-            return [self._get_comment_response(comment) for comment in comments]
+            return [self._get_comment_response(comment) for comment in comments], next_cursor
             
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         except Exception as e:
             logger.error(f"获取评论列表失败: {e}")
             raise HTTPException(
@@ -96,9 +116,7 @@ class CommentService:
     async def get_comment(self, comment_id: int, user_id: int) -> CommentResponse:
         """获取评论详情"""
         try:
-            comment = self.db.query(Comment).options(
-                joinedload(Comment.author)
-            ).filter(Comment.id == comment_id).first()
+            comment = await self._get_comment_with_author(comment_id)
             
             if comment is None:
                 raise HTTPException(
@@ -125,7 +143,7 @@ class CommentService:
     ) -> CommentResponse:
         """更新评论"""
         try:
-            comment = self.db.query(Comment).filter(Comment.id == comment_id).first()
+            comment = await self.db.get(Comment, comment_id)
             if comment is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -142,13 +160,10 @@ class CommentService:
             # 更新评论内容
             comment.content = comment_update.content
             
-            self.db.commit()
-            self.db.refresh(comment)
+            await self.db.commit()
             
             # 重新查询以获取作者信息
-            comment_with_author = self.db.query(Comment).options(
-                joinedload(Comment.author)
-            ).filter(Comment.id == comment_id).first()
+            comment_with_author = await self._get_comment_with_author(comment_id)
             
             return self._get_comment_response(comment_with_author)
             
@@ -156,7 +171,7 @@ class CommentService:
             raise
         except Exception as e:
             logger.error(f"更新评论失败: {e}")
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="更新评论失败"
@@ -164,7 +179,7 @@ class CommentService:
 
     async def delete_comment(self, comment_id: int, user_id: int):
         """删除评论（仅作者可删）"""
-        comment: Comment | None = self.db.query(Comment).filter(Comment.id == comment_id).first()
+        comment: Comment | None = await self.db.get(Comment, comment_id)
         if comment is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="评论不存在")
 
@@ -172,10 +187,10 @@ class CommentService:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限删除该评论")
 
         try:
-            self.db.delete(comment)
-            self.db.commit()
+            await self.db.delete(comment)
+            await self.db.commit()
             return {"deleted": True}
         except Exception as e:
             logger.error(f"删除评论失败: {e}")
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="删除评论失败") 
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+文档版本历史
+
+每隔 DOCUMENT_SNAPSHOT_INTERVAL 个版本保存一次完整快照，其间只保存相对上一版本的行级差异，
+快照与差异均以 zlib 压缩。最新内容直接读取 document.content；
+重建历史版本最多读取一个快照和 (间隔 - 1) 个差异。
+同一用户在 DOCUMENT_REVISION_MERGE_SECONDS 内的连续保存（如自动保存）合并到最新版本，不逐次追加。
+"""
+import json
+import logging
+import zlib
+from difflib import SequenceMatcher
+from typing import List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import DOCUMENT_SNAPSHOT_INTERVAL, DOCUMENT_REVISION_MERGE_SECONDS
+from models.document_revision import DocumentRevision
+from services.text_patch import content_hash
+from api.schemas.document import DocumentRevisionResponse, DocumentRevisionContent
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_LEVEL = 6
+# 去掉首尾相同的行后，中间差异段超过该行数时不再逐行匹配，直接整段替换，避免大文档上的平方级开销
+DELTA_MATCH_MAX_LINES = 2000
+
+
+def encode_delta(base: str, target: str) -> bytes:
+    """
+    按行计算差异：[起始行, 结束行] 表示复制上一版本的这些行，字符串表示新增的文本。
+    序列化为 JSON 后压缩。
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    # 编辑通常集中在局部，先线性跳过首尾相同的行，只对中间部分做匹配
+    common = min(len(base_lines), len(target_lines))
+    prefix = 0
+    while prefix < common and base_lines[prefix] == target_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < common - prefix and base_lines[-1 - suffix] == target_lines[-1 - suffix]:
+        suffix += 1
+    base_middle = base_lines[prefix:len(base_lines) - suffix]
+    target_middle = target_lines[prefix:len(target_lines) - suffix]
+
+    ops = []
+    if prefix:
+        ops.append([0, prefix])
+    if max(len(base_middle), len(target_middle)) <= DELTA_MATCH_MAX_LINES:
+        matcher = SequenceMatcher(None, base_middle, target_middle, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                ops.append([prefix + i1, prefix + i2])
+            elif j2 > j1:
+                ops.append("".join(target_middle[j1:j2]))
+    elif target_middle:
+        ops.append("".join(target_middle))
+    if suffix:
+        ops.append([len(base_lines) - suffix, len(base_lines)])
+    raw = json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(raw.encode("utf-8"), COMPRESS_LEVEL)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, list):
+            parts.extend(base_lines[op[0]:op[1]])
+        else:
+            parts.append(op)
+    return "".join(parts)
+
+
+def _revision_columns():
+    return (
+        DocumentRevision.revision,
+        DocumentRevision.title,
+        DocumentRevision.content_hash,
+        DocumentRevision.size,
+        DocumentRevision.stored_size,
+        DocumentRevision.is_snapshot,
+        DocumentRevision.author_id,
+        DocumentRevision.created_at,
+    )
+
+
+class DocumentRevisionService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record(
+        self,
+        document_id: int,
+        title: str,
+        content: str,
+        author_id: Optional[int],
+        previous_content: Optional[str] = None,
+        merge: bool = True,
+    ) -> int:
+        """
+        在当前事务中记录一个版本，由调用方提交。返回版本号。
+        previous_content 为修改前的正文，与最新版本一致时保存差异，否则保存快照；
+        差异压缩后不小于快照时同样保存快照。
+        merge 为 True 且最新版本由同一用户在合并窗口内创建时，直接改写最新版本而不追加新版本；
+        DOCUMENT_REVISION_MERGE_SECONDS 不大于 0 时不合并。
+        """
+        merge_since = func.datetime("now", f"-{DOCUMENT_REVISION_MERGE_SECONDS} seconds")
+        latest = (await self.db.execute(
+            select(
+                DocumentRevision.id,
+                DocumentRevision.revision,
+                DocumentRevision.base_revision,
+                DocumentRevision.content_hash,
+                DocumentRevision.author_id,
+                (DocumentRevision.created_at >= merge_since).label("recent"),
+            )
+            .where(DocumentRevision.document_id == document_id)
+            .order_by(DocumentRevision.revision.desc())
+            .limit(1)
+        )).one_or_none()
+        previous_matches = (
+            latest is not None
+            and previous_content is not None
+            and content_hash(previous_content) == latest.content_hash
+        )
+
+        if (
+            merge
+            and DOCUMENT_REVISION_MERGE_SECONDS > 0
+            and previous_matches
+            and author_id is not None
+            and latest.author_id == author_id
+            and latest.recent
+        ):
+            return await self._merge_into_latest(document_id, latest, title, content)
+
+        revision = latest.revision + 1 if latest else 1
+        snapshot = zlib.compress(content.encode("utf-8"), COMPRESS_LEVEL)
+        data, base_revision = snapshot, revision
+        if previous_matches and revision - latest.base_revision < DOCUMENT_SNAPSHOT_INTERVAL:
+            delta = encode_delta(previous_content, content)
+            if len(delta) < len(snapshot):
+                data, base_revision = delta, latest.base_revision
+
+        self.db.add(DocumentRevision(
+            document_id=document_id,
+            revision=revision,
+            base_revision=base_revision,
+            is_snapshot=base_revision == revision,
+            data=data,
+            title=title,
+            content_hash=content_hash(content),
+            size=len(content),
+            stored_size=len(data),
+            author_id=author_id,
+        ))
+        return revision
+
+    async def _merge_into_latest(self, document_id: int, latest, title: str, content: str) -> int:
+        """用新内容改写最新版本：快照直接替换，差异则相对前一版本重新计算"""
+        snapshot = zlib.compress(content.encode("utf-8"), COMPRESS_LEVEL)
+        data, base_revision = snapshot, latest.revision
+        if latest.base_revision != latest.revision:
+            base_content = await self._rebuild(document_id, latest.base_revision, latest.revision - 1)
+            if base_content is not None:
+                delta = encode_delta(base_content, content)
+                if len(delta) < len(snapshot):
+                    data, base_revision = delta, latest.base_revision
+
+        await self.db.execute(
+            update(DocumentRevision)
+            .where(DocumentRevision.id == latest.id)
+            .values(
+                base_revision=base_revision,
+                is_snapshot=base_revision == latest.revision,
+                data=data,
+                title=title,
+                content_hash=content_hash(content),
+                size=len(content),
+                stored_size=len(data),
+            )
+        )
+        return latest.revision
+
+    async def _rebuild(self, document_id: int, base_revision: int, revision: int) -> Optional[str]:
+        """从快照 base_revision 开始依次应用差异，得到 revision 的正文"""
+        chain = (await self.db.execute(
+            select(DocumentRevision.is_snapshot, DocumentRevision.data)
+            .where(
+                DocumentRevision.document_id == document_id,
+                DocumentRevision.revision.between(base_revision, revision),
+            )
+            .order_by(DocumentRevision.revision)
+        )).all()
+        content = None
+        for is_snapshot, data in chain:
+            if is_snapshot:
+                content = zlib.decompress(data).decode("utf-8")
+            elif content is not None:
+                content = apply_delta(content, data)
+        return content
+
+    async def list_revisions(self, document_id: int, skip: int = 0, limit: int = 20) -> List[DocumentRevisionResponse]:
+        """按版本号倒序列出版本信息，不读取正文数据"""
+        rows = (await self.db.execute(
+            select(*_revision_columns())
+            .where(DocumentRevision.document_id == document_id)
+            .order_by(DocumentRevision.revision.desc())
+            .offset(skip)
+            .limit(limit)
+        )).all()
+        return [DocumentRevisionResponse(**row._mapping) for row in rows]
+
+    async def get_revision(self, document_id: int, revision: int) -> DocumentRevisionContent:
+        """从所在链的快照开始依次应用差异，重建指定版本的正文"""
+        target = (await self.db.execute(
+            select(*_revision_columns(), DocumentRevision.base_revision).where(
+                DocumentRevision.document_id == document_id,
+                DocumentRevision.revision == revision,
+            )
+        )).one_or_none()
+        if target is None:
+            raise ValueError("版本不存在")
+
+        content = await self._rebuild(document_id, target.base_revision, revision)
+        if content is None or content_hash(content) != target.content_hash:
+            logger.error(f"文档版本重建校验失败: document_id={document_id}, revision={revision}")
+            raise ValueError("版本数据已损坏")
+
+        fields = dict(target._mapping)
+        fields.pop("base_revision")
+        return DocumentRevisionContent(**fields, content=content)
@@ -1,35 +1,117 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from typing import List, Optional, Tuple, Union
+from sqlalchemy.orm import selectinload, noload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert, update, union, func, exists
 from models.document import Document
+from models.document_share import DocumentShare
+from models.document_revision import DocumentRevision
 from models.project_membership import ProjectMembership
-from api.schemas.document import DocumentCreate, DocumentUpdate, DocumentResponse, DocumentWithComments
+from models.project import Project
+from models.user import User
+from api.schemas.document import (
+    DocumentCreate,
+    DocumentUpdate,
+    DocumentResponse,
+    DocumentSummaryResponse,
+    DocumentContentPatch,
+    DocumentContentPatchResult,
+    DocumentRevisionResponse,
+    DocumentRevisionContent,
+    DocumentWithComments,
+    DocumentCommentResponse,
+)
 from models.document_comment import DocumentComment
+from services.pagination import keyset_before, split_page
+from services.markdown_text import summarize_markdown
+from services.text_patch import apply_splices, content_hash
+from services.document_revision_service import DocumentRevisionService
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+class DocumentConflictError(Exception):
+    """增量修改的基准版本与当前正文不一致"""
+
+
 class DocumentService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
+    def _visible_document_ids(self, user_id: int):
+        return union(
+            select(Document.id).where(Document.author_id == user_id),
+            select(DocumentShare.document_id).where(DocumentShare.user_id == user_id),
+            select(Document.id).join(
+                ProjectMembership, ProjectMembership.project_id == Document.project_id
+            ).where(ProjectMembership.user_id == user_id),
+        )
+
+    async def _ensure_visible(self, document_id: int, user_id: int):
+        """文档对当前用户不可见时按不存在处理"""
+        visible = await self.db.scalar(select(exists().where(
+            Document.id == document_id,
+            Document.id.in_(self._visible_document_ids(user_id)),
+        )))
+        if not visible:
+            raise ValueError("文档不存在或无权限访问")
+
+    async def _can_manage(self, document: Document, user_id: int) -> bool:
+        """作者或文档所属项目的所有者/管理员"""
+        if document.author_id == user_id:
+            return True
+        if document.project_id is None:
+            return False
+        return bool(await self.db.scalar(select(exists().where(
+            ProjectMembership.project_id == document.project_id,
+            ProjectMembership.user_id == user_id,
+            ProjectMembership.role.in_(["owner", "admin"]),
+        ))))
+
+    async def _sync_shares(self, document_id: int, user_ids: Optional[List[int]]):
+        """使 document_share 与指定可见用户列表一致，只增删有变化的记录"""
+        wanted = set(user_ids or [])
+        existing = set((await self.db.execute(
+            select(DocumentShare.user_id).where(DocumentShare.document_id == document_id)
+        )).scalars().all())
+        removed = existing - wanted
+        added = wanted - existing
+        if removed:
+            await self.db.execute(delete(DocumentShare).where(
+                DocumentShare.document_id == document_id,
+                DocumentShare.user_id.in_(removed),
+            ))
+        if added:
+            await self.db.execute(
+                insert(DocumentShare),
+                [{"document_id": document_id, "user_id": uid} for uid in added],
+            )
+
     async def create_document(self, payload: DocumentCreate, author_id: int) -> DocumentResponse:
+        excerpt, word_count = summarize_markdown(payload.content)
         document = Document(
             title=payload.title,
             content=payload.content,
+            content_hash=content_hash(payload.content),
+            excerpt=excerpt,
+            word_count=word_count,
             project_id=payload.project_id,
             specific_user_ids=payload.user_ids,  # 将 user_ids 存储到 specific_user_ids
             author_id=author_id,
         )
         self.db.add(document)
-        self.db.commit()
-        self.db.refresh(document)
+        await self.db.flush()
+        await self._sync_shares(document.id, payload.user_ids)
+        await DocumentRevisionService(self.db).record(document.id, document.title, document.content, author_id)
+        await self.db.commit()
+        await self.db.refresh(document)
         
         # 手动构建响应数据，确保字段匹配
         return DocumentResponse(
             id=document.id,
             title=document.title,
             content=document.content,
+            content_hash=document.content_hash,
             project_id=document.project_id,
             user_ids=document.specific_user_ids,  # 将 specific_user_ids 映射回 user_ids
             author_id=document.author_id,
@@ -45,12 +127,41 @@ class DocumentService:
         author_id: Optional[int] = None,
         project_id: Optional[int] = None,
         order_by: Optional[str] = None,
-    ) -> List[DocumentResponse]:
+        cursor: Optional[str] = None,
+        summary: bool = False,
+    ) -> Tuple[Union[List[DocumentResponse], List[DocumentSummaryResponse]], Optional[str]]:
+        """
+        获取文档列表，返回 (当前页文档, 下一页游标)
+        游标分页仅支持默认排序（创建时间降序），自定义排序时使用 skip/limit
+        summary=True 时只查询列表需要的列（摘要代替正文），作者和项目名称通过联表获取
+        """
         try:
+            if cursor and order_by:
+                raise ValueError("游标分页仅支持默认排序")
+
             logger.info(f"开始获取文档列表: user_id={user_id}, skip={skip}, limit={limit}, author_id={author_id}, project_id={project_id}, order_by={order_by}")
             
             # 构建基础查询
-            stmt = select(Document)
+            if summary:
+                stmt = select(
+                    Document.id,
+                    Document.title,
+                    Document.project_id,
+                    Project.name.label("project_name"),
+                    Document.author_id,
+                    User.name.label("author_name"),
+                    Document.excerpt,
+                    Document.word_count,
+                    Document.created_at,
+                    Document.updated_at,
+                ).outerjoin(
+                    User, User.id == Document.author_id
+                ).outerjoin(
+                    Project, Project.id == Document.project_id
+                )
+            else:
+                # 响应不使用作者和项目对象，跳过模型上默认的联表加载
+                stmt = select(Document).options(noload(Document.author), noload(Document.project))
             
             # 应用基础过滤条件
             if author_id is not None:
@@ -58,59 +169,9 @@ class DocumentService:
             if project_id is not None:
                 stmt = stmt.where(Document.project_id == project_id)
             
-            # 权限控制：直接在SQL层面过滤
-            # 用户可以看到的文档条件：
-            # 1. 文档创建者
-            # 2. 文档中指定的用户
-            # 3. 项目成员（如果文档属于项目）
-            
-            from sqlalchemy import or_, and_
-            
-            # 基础权限条件：创建者或指定用户
-            base_permission = or_(
-                Document.author_id == user_id,  # 文档创建者
-                Document.specific_user_ids.contains(user_id)  # 文档指定用户 - 修复：查找数组是否包含单个用户ID
-            )
-            
-            if project_id is not None:
-                # 如果指定了项目ID，还需要检查项目成员权限
-                project_permission = and_(
-                    Document.project_id == project_id,
-                    Document.id.in_(
-                        select(Document.id).join(
-                            ProjectMembership, 
-                            ProjectMembership.project_id == Document.project_id
-                        ).where(ProjectMembership.user_id == user_id)
-                    )
-                )
-                
-                # 最终权限：基础权限 OR 项目成员权限
-                stmt = stmt.where(or_(base_permission, project_permission))
-                
-                logger.info(f"应用项目权限过滤: project_id={project_id}, user_id={user_id}")
-                
-            else:
-                # 如果没有指定项目ID，检查用户是否有权限访问任何项目文档
-                # 查询用户所在的所有项目
-                user_projects_query = select(ProjectMembership.project_id).where(ProjectMembership.user_id == user_id)
-                user_project_ids = self.db.execute(user_projects_query).scalars().all()
-                
-                if user_project_ids:
-                    # 用户是某些项目的成员，可以访问这些项目的文档
-                    project_permission = Document.id.in_(
-                        select(Document.id).join(
-                            ProjectMembership, 
-                            ProjectMembership.project_id == Document.project_id
-                        ).where(ProjectMembership.user_id == user_id)
-                    )
-                    
-                    # 最终权限：基础权限 OR 项目成员权限
-                    stmt = stmt.where(or_(base_permission, project_permission))
-                    logger.info(f"用户 {user_id} 是项目成员，可以访问项目文档")
-                else:
-                    # 用户不是任何项目的成员，只能看到自己创建的文档和指定给自己的文档
-                    stmt = stmt.where(base_permission)
-                    logger.info(f"用户 {user_id} 不是任何项目成员，只能看到自己的文档")
+            # 权限控制：可见文档 = 作者本人 ∪ 共享给用户 ∪ 用户所在项目的文档
+            # 三条路径各自走索引，UNION 后按主键过滤
+            stmt = stmt.where(Document.id.in_(self._visible_document_ids(user_id)))
             
             # 处理排序
             if order_by:
@@ -132,16 +193,29 @@ class DocumentService:
                     else:
                         logger.warning(f"未知的排序字段: {order_by}")
             else:
-                # 默认按创建时间降序排序
-                stmt = stmt.order_by(Document.created_at.desc())
+                # 默认按创建时间降序排序，id 保证同一时间的记录顺序稳定
+                stmt = stmt.order_by(Document.created_at.desc(), Document.id.desc())
                 logger.info("应用默认排序: created_at desc")
-                
-            stmt = stmt.offset(skip).limit(limit)
+            
+            after = keyset_before(Document.created_at, Document.id, cursor)
+            if after is not None:
+                stmt = stmt.where(after)
+            else:
+                stmt = stmt.offset(skip)
+            stmt = stmt.limit(limit + 1)
             logger.info(f"执行查询: {stmt}")
             
-            rows = self.db.execute(stmt).scalars().all()
+            result = await self.db.execute(stmt)
+            rows = result.all() if summary else result.scalars().all()
+            if order_by:
+                rows, next_cursor = list(rows[:limit]), None
+            else:
+                rows, next_cursor = split_page(rows, limit, lambda d: (d.created_at, d.id))
             logger.info(f"查询结果数量: {len(rows)}")
             
+            if summary:
+                return [DocumentSummaryResponse(**row._mapping) for row in rows], next_cursor
+            
             # 转换结果
             result = []
             for row in rows:
@@ -150,6 +224,7 @@ class DocumentService:
                         "id": row.id,
                         "title": row.title,
                         "content": row.content,
+                        "content_hash": row.content_hash,
                         "project_id": row.project_id,
                         "user_ids": row.specific_user_ids,  # 映射 specific_user_ids 到 user_ids
                         "author_id": row.author_id,
@@ -163,43 +238,76 @@ class DocumentService:
                     continue
             
             logger.info("文档列表获取成功")
-            return result
+            return result, next_cursor
             
         except Exception as e:
             logger.error(f"获取文档列表时发生错误: {str(e)}", exc_info=True)
             raise
 
     async def get_document(self, document_id: int, user_id: int) -> DocumentWithComments:
-        row = self.db.get(Document, document_id)
+        # 异步会话不支持懒加载，评论需要预加载
+        row = await self.db.get(Document, document_id, options=[selectinload(Document.comments)])
         if not row:
             raise ValueError("文档不存在")
         # TODO: 权限控制（项目成员检查）
-        return DocumentWithComments.model_validate(row)
+        return DocumentWithComments(
+            id=row.id,
+            title=row.title,
+            content=row.content,
+            content_hash=row.content_hash,
+            project_id=row.project_id,
+            user_ids=row.specific_user_ids,
+            author_id=row.author_id,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            comments=[
+                DocumentCommentResponse(
+                    id=c.id,
+                    content=c.content,
+                    document_id=c.document_id,
+                    author_id=c.author_id,
+                    created_at=c.created_at,
+                    updated_at=c.updated_at,
+                )
+                for c in row.comments
+            ],
+        )
 
     async def update_document(self, document_id: int, payload: DocumentUpdate, user_id: int) -> DocumentResponse:
-        row = self.db.get(Document, document_id)
+        row = await self.db.get(Document, document_id)
         if not row:
             raise ValueError("文档不存在")
         # TODO: 权限控制（作者或项目管理员）
+        previous_title, previous_content = row.title, row.content
         
         if payload.title is not None:
             row.title = payload.title
         if payload.content is not None:
             row.content = payload.content
+            row.content_hash = content_hash(payload.content)
+            row.excerpt, row.word_count = summarize_markdown(payload.content)
         # 修复：允许将 project_id 设置为 None 来清空项目关联
         if hasattr(payload, 'project_id'):  # 检查字段是否存在
             row.project_id = payload.project_id  # 可以是 None 或具体值
         if payload.user_ids is not None:
             row.specific_user_ids = payload.user_ids
+            await self._sync_shares(row.id, payload.user_ids)
+        # 先写入文档行再生成版本，版本号的分配与文档更新处于同一写事务中
+        await self.db.flush()
+        if (row.title, row.content) != (previous_title, previous_content):
+            await DocumentRevisionService(self.db).record(
+                row.id, row.title, row.content, user_id, previous_content=previous_content
+            )
             
-        self.db.commit()
-        self.db.refresh(row)
+        await self.db.commit()
+        await self.db.refresh(row)
         
         # 手动构建响应数据，确保字段匹配
         return DocumentResponse(
             id=row.id,
             title=row.title,
             content=row.content,
+            content_hash=row.content_hash,
             project_id=row.project_id,
             user_ids=row.specific_user_ids,
             author_id=row.author_id,
@@ -207,12 +315,113 @@ class DocumentService:
             updated_at=row.updated_at
         )
 
+    async def patch_document_content(
+        self, document_id: int, patch: DocumentContentPatch, user_id: int
+    ) -> DocumentContentPatchResult:
+        """
+        在服务端对正文应用替换操作，仅对当前用户可见的文档生效（作者、共享用户、项目成员）。
+        基准哈希与当前正文不一致时抛出 DocumentConflictError，
+        写入时再次以哈希为条件，避免并发保存互相覆盖。
+        """
+        row = (await self.db.execute(
+            select(Document.title, Document.content, Document.content_hash).where(
+                Document.id == document_id,
+                Document.id.in_(self._visible_document_ids(user_id)),
+            )
+        )).one_or_none()
+        if row is None:
+            raise ValueError("文档不存在或无权限访问")
+        current_hash = row.content_hash or content_hash(row.content)
+        if current_hash != patch.base_hash:
+            raise DocumentConflictError("文档已被修改，请获取最新内容后重试")
+
+        content = apply_splices(row.content, [(s.start, s.end, s.text) for s in patch.splices])
+        new_hash = content_hash(content)
+        excerpt, word_count = summarize_markdown(content)
+        result = await self.db.execute(
+            update(Document)
+            .where(Document.id == document_id, Document.content_hash.is_not_distinct_from(row.content_hash))
+            .values(
+                content=content,
+                content_hash=new_hash,
+                excerpt=excerpt,
+                word_count=word_count,
+                updated_at=func.now(),
+            )
+            .returning(Document.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        updated_at = result.scalar_one_or_none()
+        if updated_at is None:
+            await self.db.rollback()
+            raise DocumentConflictError("文档已被修改，请获取最新内容后重试")
+        await DocumentRevisionService(self.db).record(
+            document_id, row.title, content, user_id, previous_content=row.content
+        )
+        await self.db.commit()
+        return DocumentContentPatchResult(
+            id=document_id, content_hash=new_hash, word_count=word_count, updated_at=updated_at
+        )
+
     async def delete_document(self, document_id: int, user_id: int) -> bool:
-        row = self.db.get(Document, document_id)
+        # 预加载评论与共享记录，删除时级联删除
+        row = await self.db.get(
+            Document, document_id, options=[selectinload(Document.comments), selectinload(Document.shares)]
+        )
         if not row:
             raise ValueError("文档不存在")
         # TODO: 权限控制（作者或项目管理员）
         
-        self.db.delete(row)
-        self.db.commit()
-        return True
\ No newline at end of file
+        # 版本数据可能较大，批量删除而不加载到会话中
+        await self.db.execute(delete(DocumentRevision).where(DocumentRevision.document_id == document_id))
+        await self.db.delete(row)
+        await self.db.commit()
+        return True
+
+    async def restore_revision(self, document_id: int, revision: int, user_id: int) -> DocumentResponse:
+        """
+        将文档恢复为指定版本的标题与正文，恢复操作本身记为一个新版本。
+        仅作者或项目所有者/管理员可以恢复，其他用户抛出 PermissionError。
+        """
+        row = await self.db.get(Document, document_id, options=[noload(Document.author), noload(Document.project)])
+        if not row:
+            raise ValueError("文档不存在或无权限访问")
+        if not await self._can_manage(row, user_id):
+            await self._ensure_visible(document_id, user_id)
+            raise PermissionError("只有作者或项目管理员可以恢复历史版本")
+        revisions = DocumentRevisionService(self.db)
+        target = await revisions.get_revision(document_id, revision)
+        previous_content = row.content
+
+        row.title = target.title
+        row.content = target.content
+        row.content_hash = target.content_hash
+        row.excerpt, row.word_count = summarize_markdown(target.content)
+        await self.db.flush()
+        # 恢复点单独保留为一个版本，不与此前的编辑合并
+        await revisions.record(row.id, row.title, row.content, user_id, previous_content=previous_content, merge=False)
+        await self.db.commit()
+        await self.db.refresh(row)
+
+        return DocumentResponse(
+            id=row.id,
+            title=row.title,
+            content=row.content,
+            content_hash=row.content_hash,
+            project_id=row.project_id,
+            user_ids=row.specific_user_ids,
+            author_id=row.author_id,
+            created_at=row.created_at,
+            updated_at=row.updated_at
+        )
+
+    async def list_revisions(
+        self, document_id: int, user_id: int, skip: int = 0, limit: int = 20
+    ) -> List[DocumentRevisionResponse]:
+        """历史版本与文档使用相同的可见性规则，取消共享后同样不可再查看"""
+        await self._ensure_visible(document_id, user_id)
+        return await DocumentRevisionService(self.db).list_revisions(document_id, skip, limit)
+
+    async def get_revision(self, document_id: int, revision: int, user_id: int) -> DocumentRevisionContent:
+        await self._ensure_visible(document_id, user_id)
+        return await DocumentRevisionService(self.db).get_revision(document_id, revision)
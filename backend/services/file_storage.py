@@ -0,0 +1,80 @@
+"""
+上传文件落盘：按块流式写入临时文件，边写边校验大小并计算哈希，完成后原子重命名到目标位置
+
+每个并发上传占用的内存只与块大小有关，与文件大小无关。
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from config import UPLOAD_CHUNK_SIZE
+
+
+class FileTooLargeError(Exception):
+    """上传内容超过大小限制"""
+
+
+@dataclass
+class TempUpload:
+    path: Path
+    size: int
+    sha256: str
+
+
+def make_temp_path(directory: Path, suffix: str = ".part") -> Path:
+    """在目标目录下创建临时文件，保证之后的 os.replace 在同一文件系统内完成"""
+    fd, name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=suffix)
+    os.close(fd)
+    return Path(name)
+
+
+def _write_chunk(fh, chunk: bytes):
+    fh.write(chunk)
+
+
+def _finish(fh):
+    fh.flush()
+    os.fsync(fh.fileno())
+    fh.close()
+
+
+async def stream_to_temp(file: UploadFile, directory: Path, max_size: int) -> TempUpload:
+    """
+    将上传内容分块写入 directory 下的临时文件。
+    超过 max_size 时删除临时文件并抛出 FileTooLargeError。
+    """
+    path = make_temp_path(directory)
+    hasher = hashlib.sha256()
+    size = 0
+    fh = open(path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError()
+            hasher.update(chunk)
+            await run_in_threadpool(_write_chunk, fh, chunk)
+        await run_in_threadpool(_finish, fh)
+    except BaseException:
+        fh.close()
+        discard(path)
+        raise
+    return TempUpload(path=path, size=size, sha256=hasher.hexdigest())
+
+
+def commit_file(temp_path: Path, dest: Path):
+    """原子地将临时文件移动到最终位置"""
+    os.replace(temp_path, dest)
+
+
+def discard(path: Path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
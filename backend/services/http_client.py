@@ -0,0 +1,159 @@
+"""
+上游 HTTP 客户端：应用生命周期内复用连接池（keep-alive），带超时、重试退避与熔断
+
+每个上游服务对应一个 UpstreamClient，底层 httpx.AsyncClient 在首次使用时创建，
+应用关闭时由 lifespan 统一释放。
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+import httpx
+from config import (
+    UPSTREAM_TIMEOUT_SECONDS,
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_RETRIES,
+    UPSTREAM_RETRY_BACKOFF,
+    UPSTREAM_BREAKER_THRESHOLD,
+    UPSTREAM_BREAKER_COOLDOWN,
+)
+
+logger = logging.getLogger(__name__)
+
+# 请求尚未发出的错误，任何方法都可以安全重试
+_SAFE_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+_RETRY_STATUS = {502, 503, 504}
+
+
+class CircuitOpenError(httpx.RequestError):
+    """熔断打开期间直接拒绝请求；继承 RequestError，调用方按网络错误处理即可"""
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后熔断 cooldown 秒；冷却结束后放行一个试探请求，
+    成功则恢复，失败则重新熔断。
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def release_probe(self):
+        """请求被取消时只释放试探名额，不计入失败"""
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self._opened_at is not None or self._failures >= self.threshold:
+            self._opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_COOLDOWN)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(UPSTREAM_TIMEOUT_SECONDS, connect=UPSTREAM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=UPSTREAM_MAX_CONNECTIONS,
+                    max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        发送请求。连接类错误总是重试；读超时、协议错误和 502/503/504 仅对幂等方法重试。
+        网络错误、5xx 及其他异常均计入熔断；4xx 属于业务错误、请求被取消与上游无关，均不计入。
+        """
+        method = method.upper()
+        idempotent = method in _IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"上游服务 {self.name} 暂不可用（熔断中）")
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.RequestError as e:
+                self.breaker.record_failure()
+                retryable = isinstance(e, _SAFE_RETRY_ERRORS) or (
+                    idempotent and isinstance(e, (httpx.TimeoutException, httpx.RemoteProtocolError))
+                )
+                if not retryable or attempt >= UPSTREAM_RETRIES:
+                    raise
+                logger.warning(f"请求上游 {self.name} 失败，准备重试（第{attempt + 1}次）: {e!r}")
+            except asyncio.CancelledError:
+                # 客户端断开等原因取消请求与上游健康无关，只释放试探名额
+                self.breaker.release_probe()
+                raise
+            except BaseException:
+                # 其他异常计为失败，保证熔断试探状态总能释放
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if not (idempotent and response.status_code in _RETRY_STATUS) or attempt >= UPSTREAM_RETRIES:
+                    return response
+                await response.aclose()
+                logger.warning(f"上游 {self.name} 返回 {response.status_code}，准备重试（第{attempt + 1}次）")
+            await asyncio.sleep(UPSTREAM_RETRY_BACKOFF * (2 ** attempt) * (0.5 + random.random()))
+            attempt += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+_clients: Dict[str, UpstreamClient] = {}
+
+
+def get_upstream_client(name: str) -> UpstreamClient:
+    """按上游名称获取共享客户端（auth_api / wechat_api）"""
+    client = _clients.get(name)
+    if client is None:
+        client = _clients[name] = UpstreamClient(name)
+    return client
+
+
+async def close_upstream_clients():
+    for client in _clients.values():
+        await client.aclose()
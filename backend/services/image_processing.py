@@ -0,0 +1,267 @@
+"""
+图片处理：在独立进程池中执行解码、缩放与压缩，避免阻塞事件循环
+
+进程池有容量上限（工作进程数 + 排队数），超出时直接拒绝，由接口返回 429；
+每个任务有超时时间。超时的任务仍会占用工作进程直到完成，因此容量在任务真正结束时才释放。
+后台缩略图任务另有独立的排队上限，不占用上传缩放的容量。
+"""
+import asyncio
+import functools
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set, Tuple
+from PIL import Image
+from config import IMAGE_WORKERS, IMAGE_QUEUE_SIZE, IMAGE_JOB_TIMEOUT, IMAGE_RENDITION_QUEUE_SIZE
+from services.file_storage import discard, make_temp_path
+
+logger = logging.getLogger(__name__)
+
+
+def resize_image(image_data: bytes, max_size: tuple = (800, 800)) -> bytes:
+    """调整图片大小"""
+    try:
+        image = Image.open(io.BytesIO(image_data))
+
+        # 如果是 RGBA 模式，转换为 RGB
+        if image.mode in ('RGBA', 'LA'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            if image.mode == 'RGBA':
+                background.paste(image, mask=image.split()[-1])
+            else:
+                background.paste(image, mask=image.split()[-1])
+            image = background
+
+        # 调整大小，保持宽高比
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        # 保存到字节流
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=85, optimize=True)
+        return output.getvalue()
+    except Exception as e:
+        print(f"图片处理失败: {e}")
+        return image_data
+
+
+def _run_job(src_path: str, dst_path: str, max_size: tuple) -> Tuple[int, str, float]:
+    """在工作进程中执行：读取原图、缩放后写入目标文件，返回 (大小, sha256, 耗时)"""
+    started = time.perf_counter()
+    with open(src_path, "rb") as f:
+        result = resize_image(f.read(), max_size)
+    with open(dst_path, "wb") as f:
+        f.write(result)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(result), hashlib.sha256(result).hexdigest(), time.perf_counter() - started
+
+
+RENDITION_FORMATS = {
+    "jpeg": {"format": "JPEG", "quality": 85, "optimize": True},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+}
+
+
+def _run_renditions_job(src_path: str, targets: List[Tuple[int, str, str]]) -> Tuple[int, float]:
+    """
+    在工作进程中执行：按 (尺寸, 格式, 目标路径) 生成缩略图，先写唯一的临时文件再原子重命名。
+    原图只解码一次，从大到小依次缩放。返回 (生成数量, 耗时)
+    """
+    started = time.perf_counter()
+    image = Image.open(src_path)
+    image.load()
+    if image.mode not in ("RGB", "L"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+    count = 0
+    for size, fmt, dst_path in sorted(targets, key=lambda t: -t[0]):
+        if image.width > size or image.height > size:
+            image = image.copy()
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        tmp_path = make_temp_path(os.path.dirname(dst_path))
+        try:
+            with open(tmp_path, "wb") as f:
+                image.save(f, **RENDITION_FORMATS[fmt])
+            os.replace(tmp_path, dst_path)
+        except BaseException:
+            discard(tmp_path)
+            raise
+        count += 1
+    return count, time.perf_counter() - started
+
+
+class ImageQueueFullError(Exception):
+    """图片处理队列已满"""
+
+
+class ImageProcessor:
+    def __init__(self, workers: int, queue_size: int, timeout: float, background_queue_size: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.background_capacity = background_queue_size
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._background_pending = 0
+        # 正在生成的缩略图路径，同一图片并发上传时不重复提交
+        self._renditions_in_flight: Set[str] = set()
+        self._stats = {
+            "processed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "background_rejected": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor):
+        """工作进程异常退出（内存不足、解压炸弹等）后进程池不可再用，丢弃后在下次提交时重建"""
+        if self._executor is not broken:
+            return
+        self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("图片处理进程池已损坏，已丢弃并将重建")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _release(self, background: bool, future):
+        with self._lock:
+            if background:
+                self._background_pending -= 1
+            else:
+                self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._stats["failed"] += 1
+                return
+            seconds = future.result()[-1]
+            self._stats["processed"] += 1
+            self._stats["total_seconds"] += seconds
+            self._stats["max_seconds"] = max(self._stats["max_seconds"], seconds)
+
+    def _submit(self, fn, *args, background: bool = False) -> Tuple[ProcessPoolExecutor, Future]:
+        """
+        占用一个容量名额并提交任务，返回 (所用进程池, future)；队列已满时抛出 ImageQueueFullError。
+        background=True 的任务使用独立的名额。进程池已损坏时重建后重试一次。
+        """
+        with self._lock:
+            if background:
+                if self._background_pending >= self.background_capacity:
+                    self._stats["background_rejected"] += 1
+                    raise ImageQueueFullError("图片处理繁忙，请稍后重试")
+                self._background_pending += 1
+            else:
+                if self._pending >= self.capacity:
+                    self._stats["rejected"] += 1
+                    raise ImageQueueFullError("图片处理繁忙，请稍后重试")
+                self._pending += 1
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                if background:
+                    self._background_pending -= 1
+                else:
+                    self._pending -= 1
+            raise
+        future.add_done_callback(functools.partial(self._release, background))
+        return executor, future
+
+    def submit_renditions(self, src_path: str, targets: List[Tuple[int, str, str]]) -> bool:
+        """
+        后台生成缩略图，不等待结果；已在生成中的目标会被跳过。
+        队列已满时放弃并返回 False，缺失的缩略图在读取时回退到原图。
+        """
+        with self._lock:
+            targets = [t for t in targets if t[2] not in self._renditions_in_flight]
+            self._renditions_in_flight.update(t[2] for t in targets)
+        if not targets:
+            return True
+        paths = [t[2] for t in targets]
+
+        def finished(_):
+            with self._lock:
+                self._renditions_in_flight.difference_update(paths)
+
+        try:
+            _, future = self._submit(_run_renditions_job, str(src_path), targets, background=True)
+        except ImageQueueFullError:
+            finished(None)
+            logger.warning(f"图片处理队列已满，跳过缩略图生成: {src_path}")
+            return False
+        except Exception:
+            finished(None)
+            raise
+        future.add_done_callback(finished)
+        return True
+
+    async def resize_file(self, src_path: str, dst_path: str, max_size: tuple) -> Tuple[int, str]:
+        """
+        提交缩放任务并等待结果，返回输出文件的 (大小, sha256)。
+        图片数据由工作进程直接读写文件，不经过主进程内存。
+        队列已满时抛出 ImageQueueFullError，超时抛出 asyncio.TimeoutError；
+        超时或被取消后工作进程可能仍在写入 dst_path，由本方法在任务结束时删除。
+        工作进程崩溃时本次请求抛出 BrokenProcessPool，进程池随即重建，不影响后续请求。
+        """
+        executor, future = self._submit(_run_job, str(src_path), str(dst_path), max_size)
+        try:
+            size, digest, _ = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            raise
+        except BaseException as e:
+            if isinstance(e, asyncio.TimeoutError):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+            # 超时或请求被取消：任务尚未开始则取消，否则工作进程仍可能写入 dst_path，结束后删除
+            if not future.cancel():
+                future.add_done_callback(lambda _: discard(dst_path))
+            raise
+        return size, digest
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            pending = self._pending
+            background_pending = self._background_pending
+        processed = stats.pop("total_seconds")
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": pending,
+            "queue_depth": max(pending - self.workers, 0),
+            "background_capacity": self.background_capacity,
+            "background_in_flight": background_pending,
+            **stats,
+            "avg_seconds": round(processed / stats["processed"], 4) if stats["processed"] else 0.0,
+            "max_seconds": round(stats["max_seconds"], 4),
+        }
+
+
+image_processor = ImageProcessor(IMAGE_WORKERS, IMAGE_QUEUE_SIZE, IMAGE_JOB_TIMEOUT, IMAGE_RENDITION_QUEUE_SIZE)
@@ -0,0 +1,42 @@
+"""
+Markdown 转纯文本：用于生成文档摘要与字数统计
+"""
+import re
+from typing import Tuple
+from config import DOCUMENT_EXCERPT_LENGTH
+
+_CODE_FENCE_RE = re.compile(r"```.*?```|~~~.*?~~~", re.S)
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_LINE_MARK_RE = re.compile(r"^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+(\[[ xX]\]\s+)?|\d+[.)]\s+)", re.M)
+_INLINE_MARK_RE = re.compile(r"(\*\*|__|~~|`|\*|_)")
+_TABLE_RULE_RE = re.compile(r"^\s*\|?\s*:?-{3,}.*$|^\s*([-*_]\s*){3,}$", re.M)
+_WHITESPACE_RE = re.compile(r"\s+")
+# 中日韩字符按字计数，其余按空白分隔的单词计数
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af]")
+_WORD_RE = re.compile(r"[A-Za-z0-9]+(?:['’.-][A-Za-z0-9]+)*")
+
+
+def markdown_to_text(content: str) -> str:
+    text = _CODE_FENCE_RE.sub(" ", content or "")
+    text = _IMAGE_RE.sub(r"\1", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = _TABLE_RULE_RE.sub(" ", text)
+    text = _LINE_MARK_RE.sub("", text)
+    text = _INLINE_MARK_RE.sub("", text)
+    text = text.replace("|", " ")
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def count_words(text: str) -> int:
+    return len(_CJK_RE.findall(text)) + len(_WORD_RE.findall(_CJK_RE.sub(" ", text)))
+
+
+def summarize_markdown(content: str, length: int = DOCUMENT_EXCERPT_LENGTH) -> Tuple[str, int]:
+    """返回 (纯文本摘要, 字数)"""
+    text = markdown_to_text(content)
+    excerpt = text if len(text) <= length else text[:length].rstrip() + "…"
+    return excerpt, count_words(text)
+
@@ -1,13 +1,29 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select, update
+from typing import List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, func
 from models.message import Message, MessageRecipient
+from models.project_membership import ProjectMembership
 from models.user import User
 from api.schemas.message import MessageCreate, MessageResponse, UserNotificationResponse
+from config import MESSAGE_UNREAD_CACHE_TTL, MESSAGE_UNREAD_CACHE_SIZE
+from services.cache import TTLCache
+from services.pagination import keyset_before, split_page
+from services.notification_hub import notification_hub
 from datetime import datetime
 
+# 用户ID -> 未读数量；写操作提交后增量维护，TTL 兜底多进程下的不一致
+_unread_cache = TTLCache(maxsize=MESSAGE_UNREAD_CACHE_SIZE, ttl=MESSAGE_UNREAD_CACHE_TTL)
+
+
+def _adjust_unread_cache(user_id: int, delta: int):
+    """仅在已缓存时调整，未缓存的用户下次查询时重新统计"""
+    count = _unread_cache.get(user_id)
+    if count is not None:
+        _unread_cache.set(user_id, max(count + delta, 0))
+
+
 class MessageService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_message(self, payload: MessageCreate) -> MessageResponse:
@@ -23,17 +39,33 @@ class MessageService:
             data_json=payload.data_json,
         )
         self.db.add(msg)
-        self.db.commit()
-        self.db.refresh(msg)
-
-        # 展开接收人
-        if payload.recipient_user_ids:
-            recipients = [
-                MessageRecipient(message_id=msg.id, recipient_user_id=uid)
-                for uid in payload.recipient_user_ids
-            ]
-            self.db.add_all(recipients)
-            self.db.commit()
+        await self.db.flush()  # 获取消息ID
+
+        # 展开接收人：去重后批量插入，与主消息在同一事务中提交
+        user_ids = list(dict.fromkeys(payload.recipient_user_ids))
+        if user_ids:
+            await self.db.execute(
+                insert(MessageRecipient),
+                [{"message_id": msg.id, "recipient_user_id": uid} for uid in user_ids],
+            )
+        if payload.recipient_project_id is not None:
+            # 项目成员直接在SQL中展开，跳过已显式指定的接收人
+            members = select(msg.id, ProjectMembership.user_id).where(
+                ProjectMembership.project_id == payload.recipient_project_id,
+                ProjectMembership.user_id.not_in(user_ids),
+            ).distinct()
+            result = await self.db.execute(
+                insert(MessageRecipient)
+                .from_select(["message_id", "recipient_user_id"], members)
+                .returning(MessageRecipient.recipient_user_id)
+            )
+            user_ids.extend(result.scalars().all())
+
+        await self.db.commit()
+        await self.db.refresh(msg)
+        for uid in user_ids:
+            _adjust_unread_cache(uid, 1)
+        await self._push_new_notifications(msg.id, user_ids)
 
         return MessageResponse(
             id=msg.id,
@@ -48,67 +80,129 @@ class MessageService:
             created_at=msg.created_at,
         )
 
-    async def list_user_notifications(self, user_id: int, read: Optional[bool] = None, skip: int = 0, limit: int = 20) -> List[UserNotificationResponse]:
-        stmt = select(MessageRecipient).where(MessageRecipient.recipient_user_id == user_id)
+    def _notification_select(self):
+        # 联表查询（接收记录 -> 消息 -> 触发者），只取响应需要的列，不构建ORM对象
+        return select(
+            MessageRecipient.id,
+            Message.type,
+            Message.level,
+            Message.title,
+            Message.content,
+            Message.entity_type,
+            Message.entity_id,
+            Message.actor_id,
+            User.name.label("actor_name"),
+            Message.data_json,
+            Message.created_at,
+            MessageRecipient.read,
+            MessageRecipient.read_at,
+            MessageRecipient.delivered_at,
+        ).join(
+            Message, Message.id == MessageRecipient.message_id
+        ).outerjoin(
+            User, User.id == Message.actor_id
+        )
+
+    async def _push_unread_count(self, user_id: int):
+        if notification_hub.has_subscribers(user_id):
+            notification_hub.publish(user_id, "unread_count", {"count": await self.unread_count(user_id)})
+
+    async def _push_new_notifications(self, message_id: int, user_ids: List[int]):
+        """向在线的接收人推送新通知及最新未读数"""
+        online = [uid for uid in user_ids if notification_hub.has_subscribers(uid)]
+        if not online:
+            return
+        stmt = self._notification_select().add_columns(MessageRecipient.recipient_user_id).where(
+            MessageRecipient.message_id == message_id,
+            MessageRecipient.recipient_user_id.in_(online),
+        )
+        for row in (await self.db.execute(stmt)).mappings().all():
+            data = dict(row)
+            uid = data.pop("recipient_user_id")
+            notification_hub.publish(uid, "notification", UserNotificationResponse(**data))
+        for uid in online:
+            await self._push_unread_count(uid)
+
+    async def list_user_notifications(
+        self,
+        user_id: int,
+        read: Optional[bool] = None,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[UserNotificationResponse], Optional[str]]:
+        """获取用户通知列表，返回 (当前页通知, 下一页游标)"""
+        stmt = self._notification_select().where(MessageRecipient.recipient_user_id == user_id)
         if read is not None:
             stmt = stmt.where(MessageRecipient.read == read)
-        stmt = stmt.order_by(MessageRecipient.delivered_at.desc()).offset(skip).limit(limit)
-        rows = self.db.execute(stmt).scalars().all()
-
-        result: List[UserNotificationResponse] = []
-        for r in rows:
-            m = r.message
-            # 查询触发者名称（可空）
-            actor_name = None
-            if m.actor_id:
-                user = self.db.get(User, m.actor_id)
-                actor_name = user.name if user and user.name else None
-            result.append(UserNotificationResponse(
-                id=r.id,
-                type=m.type,
-                level=m.level,
-                title=m.title,
-                content=m.content,
-                entity_type=m.entity_type,
-                entity_id=m.entity_id,
-                actor_id=m.actor_id,
-                actor_name=actor_name,
-                data_json=m.data_json,
-                created_at=m.created_at,
-                read=r.read,
-                read_at=r.read_at,
-                delivered_at=r.delivered_at,
-            ))
-        return result
+        stmt = stmt.order_by(
+            MessageRecipient.delivered_at.desc(), MessageRecipient.id.desc()
+        )
+        after = keyset_before(MessageRecipient.delivered_at, MessageRecipient.id, cursor)
+        if after is not None:
+            stmt = stmt.where(after)
+        else:
+            stmt = stmt.offset(skip)
+        rows = (await self.db.execute(stmt.limit(limit + 1))).mappings().all()
+        rows, next_cursor = split_page(rows, limit, lambda r: (r["delivered_at"], r["id"]))
+
+        return [UserNotificationResponse(**row) for row in rows], next_cursor
 
     async def unread_count(self, user_id: int) -> int:
-        stmt = select(MessageRecipient).where(
+        cached = _unread_cache.get(user_id)
+        if cached is not None:
+            return cached
+        # 走 (recipient_user_id, read, deleted) 复合索引，只做计数不加载行
+        stmt = select(func.count()).select_from(MessageRecipient).where(
             MessageRecipient.recipient_user_id == user_id,
-            MessageRecipient.read == False  # noqa: E712
+            MessageRecipient.read == False,  # noqa: E712
+            MessageRecipient.deleted == False  # noqa: E712
         )
-        return len(self.db.execute(stmt).scalars().all())
+        count = await self.db.scalar(stmt) or 0
+        _unread_cache.set(user_id, count)
+        return count
 
     async def mark_read(self, recipient_id: int, user_id: int) -> bool:
-        r = self.db.get(MessageRecipient, recipient_id)
+        r = await self.db.get(MessageRecipient, recipient_id)
         if not r or r.recipient_user_id != user_id:
             return False
         if not r.read:
             r.read = True
             r.read_at = datetime.now()
-            self.db.commit()
+            await self.db.commit()
+            if not r.deleted:
+                _adjust_unread_cache(user_id, -1)
+            await self._push_unread_count(user_id)
         return True
 
+    async def mark_read_batch(self, recipient_ids: List[int], user_id: int) -> int:
+        """批量标记为已读，单条 UPDATE 完成，只影响属于当前用户的未读记录，返回实际更新条数"""
+        if not recipient_ids:
+            return 0
+        stmt = update(MessageRecipient).where(
+            MessageRecipient.id.in_(set(recipient_ids)),
+            MessageRecipient.recipient_user_id == user_id,
+            MessageRecipient.read == False  # noqa: E712
+        ).values(read=True, read_at=datetime.now()).execution_options(synchronize_session=False)
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        if result.rowcount:
+            # 可能包含已删除记录，直接失效由下次查询重新统计
+            _unread_cache.pop(user_id)
+            await self._push_unread_count(user_id)
+        return result.rowcount
+
     async def mark_all_read(self, user_id: int) -> int:
-        stmt = select(MessageRecipient).where(
+        # 集合式 UPDATE，不加载行对象
+        stmt = update(MessageRecipient).where(
             MessageRecipient.recipient_user_id == user_id,
             MessageRecipient.read == False  # noqa: E712
-        )
-        rows = self.db.execute(stmt).scalars().all()
-        count = 0
-        for r in rows:
-            r.read = True
-            r.read_at = datetime.now()
-            count += 1
+        ).values(read=True, read_at=datetime.now()).execution_options(synchronize_session=False)
+        result = await self.db.execute(stmt)
+        count = result.rowcount
+        if count:
+            await self.db.commit()
+        _unread_cache.set(user_id, 0)
         if count:
-            self.db.commit()
+            await self._push_unread_count(user_id)
         return count
@@ -0,0 +1,43 @@
+"""
+进程内通知推送中心：按用户维护订阅队列，供 SSE 长连接消费
+多进程部署时每个进程只能推送给连接在本进程上的客户端
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Set
+from config import NOTIFICATION_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationHub:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, user_id: int, event: str, data: Any):
+        """向用户的所有连接投递事件；队列已满的慢连接直接丢弃该事件"""
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                logger.warning(f"用户 {user_id} 的通知队列已满，丢弃事件 {event}")
+
+
+notification_hub = NotificationHub(queue_size=NOTIFICATION_QUEUE_SIZE)
@@ -0,0 +1,62 @@
+"""
+游标（keyset）分页工具
+
+游标对调用方不透明，内部编码了上一页最后一行的 (排序时间, id)。
+下一页通过 WHERE (ts, id) < (游标ts, 游标id) 定位，配合 (ts, id) 索引，
+任意页的查询代价与第一页相同，且翻页期间插入新数据不会导致重复或遗漏。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import String, and_, literal, or_
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = json.dumps([ts.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise ValueError("无效的分页游标") from None
+
+
+def _sqlite_datetime(value: datetime):
+    """
+    SQLite 中 DATETIME 以文本存储，游标列统一为带 6 位微秒的格式（见 database.base 中的 now()），
+    比较时生成相同格式的文本，保证与 ORDER BY 的文本排序一致。
+    """
+    return literal(value.strftime("%Y-%m-%d %H:%M:%S.%f"), String)
+
+
+def keyset_before(ts_column, id_column, cursor: Optional[str]):
+    """
+    生成降序分页的游标条件：(ts, id) < 游标位置。
+    cursor 为空时返回 None。
+    """
+    if not cursor:
+        return None
+    ts, row_id = decode_cursor(cursor)
+    ts_value = _sqlite_datetime(ts)
+    return or_(
+        ts_column < ts_value,
+        and_(ts_column == ts_value, id_column < row_id),
+    )
+
+
+def split_page(rows: Sequence[Any], limit: int, key) -> Tuple[List[Any], Optional[str]]:
+    """
+    查询时多取一行（limit + 1）判断是否还有下一页。
+    key(row) 返回该行的 (ts, id)，用于生成下一页游标。
+    """
+    items = list(rows[:limit])
+    if len(rows) <= limit or not items:
+        return items, None
+    ts, row_id = key(items[-1])
+    return items, encode_cursor(ts, row_id)
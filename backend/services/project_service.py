@@ -1,43 +1,110 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, func, select, update, delete
 from datetime import datetime
 from api.schemas.project import ProjectCreate, ProjectUpdate, ProjectResponse, ProjectWithMembers
 from models.project import Project
 from models.project_membership import ProjectMembership
 from models.task import Task
+from models.subtask import Subtask
 from models.user import User
+from services.pagination import keyset_before, split_page
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ProjectService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def _get_project_task_stats(self, project_id: int) -> tuple[int, int]:
-        """获取项目的任务统计信息"""
-        try:
-            # 统计总任务数
-            task_count = self.db.query(func.count(Task.id)).filter(
-                Task.project_id == project_id
-            ).scalar() or 0
-            
-            # 统计子任务总数（从所有任务的subtasks JSON字段中统计）
-            subtask_count = 0
-            tasks = self.db.query(Task.subtasks).filter(
-                Task.project_id == project_id,
-                Task.subtasks.isnot(None)
-            ).all()
-            
-            for task in tasks:
-                if task.subtasks and isinstance(task.subtasks, list):
-                    subtask_count += len(task.subtasks)
-            
-            return task_count, subtask_count
-        except Exception as e:
-            logger.error(f"获取项目任务统计失败: {str(e)}")
-            return 0, 0
+    async def _get_project_members(self, project_ids: List[int]) -> Dict[int, List[int]]:
+        """批量获取项目成员ID，按项目聚合"""
+        members: Dict[int, List[int]] = {pid: [] for pid in project_ids}
+        if not project_ids:
+            return members
+        rows = await self.db.execute(
+            select(ProjectMembership.project_id, ProjectMembership.user_id).where(
+                ProjectMembership.project_id.in_(project_ids)
+            ).order_by(ProjectMembership.project_id, ProjectMembership.id)
+        )
+        for project_id, user_id in rows:
+            members[project_id].append(user_id)
+        return members
+
+    async def _get_project_task_stats(self, project_ids: List[int]) -> Dict[int, Tuple[int, int]]:
+        """批量获取项目的任务统计信息：{project_id: (任务数, 子任务数)}"""
+        stats: Dict[int, Tuple[int, int]] = {pid: (0, 0) for pid in project_ids}
+        if not project_ids:
+            return stats
+        # 统计总任务数
+        task_counts = dict((await self.db.execute(
+            select(Task.project_id, func.count(Task.id)).where(
+                Task.project_id.in_(project_ids)
+            ).group_by(Task.project_id)
+        )).all())
+        
+        # 统计子任务总数
+        subtask_counts = dict((await self.db.execute(
+            select(Task.project_id, func.count(Subtask.id)).join(
+                Subtask, Subtask.task_id == Task.id
+            ).where(
+                Task.project_id.in_(project_ids)
+            ).group_by(Task.project_id)
+        )).all())
+        
+        for pid in project_ids:
+            stats[pid] = (task_counts.get(pid, 0), subtask_counts.get(pid, 0))
+        return stats
+
+    async def _count_members(self, project_id: int) -> int:
+        return await self.db.scalar(
+            select(func.count(ProjectMembership.id)).where(
+                ProjectMembership.project_id == project_id
+            )
+        ) or 0
+
+    async def adjust_project_counters(self, project_id: Optional[int], task_delta: int = 0, subtask_delta: int = 0):
+        """
+        在当前事务内增量调整项目的任务/子任务计数（不提交）。
+        使用 UPDATE ... SET x = x + delta，避免并发下的读改写丢失。
+        计数维护不属于项目编辑，显式保留 updated_at，避免触发 onupdate。
+        """
+        if project_id is None or (not task_delta and not subtask_delta):
+            return
+        await self.db.execute(
+            update(Project)
+            .where(Project.id == project_id)
+            .values(
+                task_count=Project.task_count + task_delta,
+                subtask_count=Project.subtask_count + subtask_delta,
+                updated_at=Project.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def recompute_project_counters(self, project_ids: Optional[List[int]] = None) -> int:
+        """
+        根据任务、子任务和成员表重新计算项目计数（修复用，不提交）。
+        返回重算的项目数量。
+        """
+        if project_ids is None:
+            project_ids = list((await self.db.execute(select(Project.id))).scalars().all())
+        stats = await self._get_project_task_stats(project_ids)
+        members = await self._get_project_members(project_ids)
+        for pid in project_ids:
+            task_count, subtask_count = stats[pid]
+            await self.db.execute(
+                update(Project)
+                .where(Project.id == pid)
+                .values(
+                    task_count=task_count,
+                    subtask_count=subtask_count,
+                    member_count=len(members[pid]),
+                    updated_at=Project.updated_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        return len(project_ids)
 
     async def create_project(self, project: ProjectCreate, creator_id: int) -> ProjectResponse:
         """创建项目"""
@@ -53,7 +120,7 @@ class ProjectService:
             )
             
             self.db.add(db_project)
-            self.db.flush()  # 获取项目ID
+            await self.db.flush()  # 获取项目ID
             
             # 添加创建者为项目成员
             if hasattr(db_project, 'id') and db_project.id:
@@ -76,8 +143,13 @@ class ProjectService:
                                 joined_at=datetime.utcnow()
                             )
                             self.db.add(member)
+                
+                await self.db.flush()
+                db_project.member_count = await self._count_members(db_project.id)
             
-            self.db.commit()
+            await self.db.commit()
+            # 刷新由数据库生成的字段（异步会话不支持过期属性的懒加载）
+            await self.db.refresh(db_project)
             
             # 返回项目响应
             return ProjectResponse(
@@ -87,11 +159,12 @@ class ProjectService:
                 status=db_project.status,
                 created_by=str(db_project.created_by),
                 created_at=db_project.created_at.isoformat(),
-                updated_at=db_project.updated_at.isoformat()
+                updated_at=db_project.updated_at.isoformat(),
+                member_count=db_project.member_count
             )
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"创建项目失败: {str(e)}")
             raise e
 
@@ -100,33 +173,38 @@ class ProjectService:
         user_id: int, 
         skip: int = 0, 
         limit: int = 20, 
-        status_filter: Optional[str] = None
-    ) -> List[ProjectResponse]:
-        """获取用户参与的项目列表"""
+        status_filter: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[ProjectResponse], Optional[str]]:
+        """获取用户参与的项目列表，返回 (当前页项目, 下一页游标)"""
         try:
             # 构建查询条件
-            query = self.db.query(Project).join(
+            stmt = select(Project).join(
                 ProjectMembership, Project.id == ProjectMembership.project_id
-            ).filter(ProjectMembership.user_id == user_id)
+            ).where(ProjectMembership.user_id == user_id)
             
             # 添加状态过滤
             if status_filter:
-                query = query.filter(Project.status == status_filter)
+                stmt = stmt.where(Project.status == status_filter)
             
             # 分页和排序 - 修复：order_by 应该在 offset 和 limit 之前
-            projects = query.order_by(Project.created_at.desc()).offset(skip).limit(limit).all()
+            stmt = stmt.order_by(Project.created_at.desc(), Project.id.desc())
+            after = keyset_before(Project.created_at, Project.id, cursor)
+            if after is not None:
+                stmt = stmt.where(after)
+            else:
+                stmt = stmt.offset(skip)
+            projects = (await self.db.execute(stmt.limit(limit + 1))).scalars().all()
+            projects, next_cursor = split_page(projects, limit, lambda p: (p.created_at, p.id))
+            
+            # 批量获取成员，统计数据直接读取项目上的计数字段
+            project_ids = [project.id for project in projects]
+            members = await self._get_project_members(project_ids)
             
             # 转换为响应格式
             result = []
             for project in projects:
-                # 获取项目成员信息
-                members = self.db.query(ProjectMembership).filter(
-                    ProjectMembership.project_id == project.id
-                ).all()
-                user_ids = [member.user_id for member in members]
-                
-                # 获取任务统计信息
-                task_count, subtask_count = self._get_project_task_stats(project.id)
+                user_ids = members[project.id]
                 
                 result.append(ProjectResponse(
                     id=str(project.id),
@@ -137,12 +215,12 @@ class ProjectService:
                     created_at=project.created_at.isoformat(),
                     updated_at=project.updated_at.isoformat(),
                     user_ids=user_ids,
-                    member_count=len(user_ids),
-                    task_count=task_count,
-                    subtask_count=subtask_count
+                    member_count=project.member_count,
+                    task_count=project.task_count,
+                    subtask_count=project.subtask_count
                 ))
             
-            return result
+            return result, next_cursor
             
         except Exception as e:
             logger.error(f"获取用户项目列表失败: {str(e)}")
@@ -152,30 +230,23 @@ class ProjectService:
         """获取项目详情"""
         try:
             # 检查用户是否有权限访问项目
-            project_member = self.db.query(ProjectMembership).filter(
+            project_member = await self.db.scalar(select(ProjectMembership).where(
                 and_(
                     ProjectMembership.project_id == project_id,
                     ProjectMembership.user_id == user_id
                 )
-            ).first()
+            ))
             
             if not project_member:
                 raise ValueError("用户无权限访问该项目")
             
             # 获取项目信息
-            project = self.db.query(Project).filter(Project.id == project_id).first()
+            project = await self.db.get(Project, project_id)
             if not project:
                 raise ValueError("项目不存在")
             
             # 获取项目成员
-            members = self.db.query(ProjectMembership).filter(
-                ProjectMembership.project_id == project_id
-            ).all()
-            
-            user_ids = [member.user_id for member in members]
-            
-            # 获取任务统计信息
-            task_count, subtask_count = self._get_project_task_stats(project_id)
+            user_ids = (await self._get_project_members([project_id]))[project_id]
             
             return ProjectWithMembers(
                 id=str(project.id),
@@ -186,8 +257,9 @@ class ProjectService:
                 created_at=project.created_at.isoformat(),
                 updated_at=project.updated_at.isoformat(),
                 user_ids=user_ids,
-                task_count=task_count,
-                subtask_count=subtask_count
+                member_count=project.member_count,
+                task_count=project.task_count,
+                subtask_count=project.subtask_count
             )
             
         except Exception as e:
@@ -203,19 +275,19 @@ class ProjectService:
         """更新项目"""
         try:
             # 检查用户是否有权限更新项目
-            project_member = self.db.query(ProjectMembership).filter(
+            project_member = await self.db.scalar(select(ProjectMembership).where(
                 and_(
                     ProjectMembership.project_id == project_id,
                     ProjectMembership.user_id == user_id,
                     ProjectMembership.role.in_(["owner", "admin"])
                 )
-            ).first()
+            ))
             
             if not project_member:
                 raise ValueError("用户无权限更新该项目")
             
             # 获取项目
-            project = self.db.query(Project).filter(Project.id == project_id).first()
+            project = await self.db.get(Project, project_id)
             if not project:
                 raise ValueError("项目不存在")
             
@@ -232,12 +304,12 @@ class ProjectService:
             # 更新项目成员
             if project_update.user_ids is not None:
                 # 删除现有成员（除了创建者）
-                self.db.query(ProjectMembership).filter(
+                await self.db.execute(delete(ProjectMembership).where(
                     and_(
                         ProjectMembership.project_id == project_id,
                         ProjectMembership.role != "owner"
                     )
-                ).delete()
+                ))
                 
                 # 添加新成员
                 for user_id in project_update.user_ids:
@@ -249,8 +321,12 @@ class ProjectService:
                             joined_at=datetime.utcnow()
                         )
                         self.db.add(member)
+                
+                await self.db.flush()
+                project.member_count = await self._count_members(project_id)
             
-            self.db.commit()
+            await self.db.commit()
+            await self.db.refresh(project)
             
             return ProjectResponse(
                 id=str(project.id),
@@ -259,11 +335,14 @@ class ProjectService:
                 status=project.status,
                 created_by=str(project.created_by),
                 created_at=project.created_at.isoformat(),
-                updated_at=project.updated_at.isoformat()
+                updated_at=project.updated_at.isoformat(),
+                member_count=project.member_count,
+                task_count=project.task_count,
+                subtask_count=project.subtask_count
             )
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"更新项目失败: {str(e)}")
             raise e
 
@@ -271,28 +350,28 @@ class ProjectService:
         """删除项目"""
         try:
             # 检查用户是否有权限删除项目
-            project_member = self.db.query(ProjectMembership).filter(
+            project_member = await self.db.scalar(select(ProjectMembership).where(
                 and_(
                     ProjectMembership.project_id == project_id,
                     ProjectMembership.user_id == user_id,
                     ProjectMembership.role == "owner"
                 )
-            ).first()
+            ))
             
             if not project_member:
                 raise ValueError("只有项目创建者可以删除项目")
             
             # 删除项目成员
-            self.db.query(ProjectMembership).filter(
+            await self.db.execute(delete(ProjectMembership).where(
                 ProjectMembership.project_id == project_id
-            ).delete()
+            ))
             
             # 删除项目
-            self.db.query(Project).filter(Project.id == project_id).delete()
+            await self.db.execute(delete(Project).where(Project.id == project_id))
             
-            self.db.commit()
+            await self.db.commit()
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"删除项目失败: {str(e)}")
             raise e
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+全文搜索：在 search_index（FTS5 trigram）上检索文档、任务、子任务与评论
+
+查询按空白拆分成词：不少于 3 个字符的词走 FTS5 索引（AND 连接）。更短的词无法使用
+trigram 索引，只能在索引命中的行上以 LIKE 进一步过滤；查询中没有可用索引的词时直接拒绝，
+不做全表扫描。结果按 bm25 排序（标题权重更高），
+可见性规则与各列表接口一致，在索引查询内部以子查询过滤。
+标题与片段按纯文本做 HTML 转义后再插入 <mark> 标签，客户端可直接按 HTML 渲染。
+"""
+import html
+from typing import List, Optional, Sequence
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.comment import Comment
+from models.search_index import search_index, SEARCH_KINDS, SEARCH_KIND_BITS
+from models.task import Task
+from services.document_service import DocumentService
+from services.task_service import TaskService
+from api.schemas.search import SearchResult
+
+MIN_TRIGRAM_LENGTH = 3
+SNIPPET_TOKENS = 16
+# FTS5 先用私有区字符标记命中位置，转义后再替换为 <mark> 标签
+HIGHLIGHT_OPEN = "\ue000"
+HIGHLIGHT_CLOSE = "\ue001"
+# bm25 各列权重：title, body, parent_id
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+_KIND_NAMES = {code: name for name, code in SEARCH_KINDS.items()}
+
+
+def build_match_query(terms: Sequence[str]) -> Optional[str]:
+    """将词列表转为 FTS5 查询表达式，每个词作为短语加引号，避免用户输入被解析为查询语法"""
+    phrases = ['"' + term.replace('"', '""') + '"' for term in terms]
+    return " AND ".join(phrases) if phrases else None
+
+
+def render_highlight(text: Optional[str]) -> str:
+    """转义原文中的 HTML，只保留命中位置的 <mark> 标签"""
+    escaped = html.escape(text or "")
+    return escaped.replace(HIGHLIGHT_OPEN, "<mark>").replace(HIGHLIGHT_CLOSE, "</mark>")
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SearchService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _visibility_filter(self, user_id: int, kind, entity_id):
+        """search_index 行的可见性条件，按实体类型分别套用对应的规则"""
+        visible_documents = DocumentService(self.db)._visible_document_ids(user_id)
+        visible_tasks = select(Task.id).where(TaskService(self.db)._visibility_filter(user_id))
+        # 未关联任务的评论仅作者本人可见
+        own_loose_comments = select(Comment.id).where(
+            Comment.task_id.is_(None), Comment.author_id == user_id
+        )
+        parent_id = search_index.c.parent_id
+        return or_(
+            and_(kind == SEARCH_KINDS["document"], entity_id.in_(visible_documents)),
+            and_(kind == SEARCH_KINDS["task"], entity_id.in_(visible_tasks)),
+            and_(kind == SEARCH_KINDS["subtask"], parent_id.in_(visible_tasks)),
+            and_(kind == SEARCH_KINDS["comment"], or_(
+                parent_id.in_(visible_tasks), entity_id.in_(own_loose_comments)
+            )),
+            and_(kind == SEARCH_KINDS["document_comment"], parent_id.in_(visible_documents)),
+        )
+
+    async def search(
+        self,
+        user_id: int,
+        q: str,
+        types: Optional[List[str]] = None,
+        skip: int = 0,
+        limit: int = 20,
+    ) -> List[SearchResult]:
+        """
+        搜索当前用户可见的内容，按相关度排序。
+        所有词都短于 MIN_TRIGRAM_LENGTH 时无法使用索引，抛出 ValueError。
+        """
+        terms = q.split()
+        if not terms:
+            return []
+        indexed_terms = [t for t in terms if len(t) >= MIN_TRIGRAM_LENGTH]
+        short_terms = [t for t in terms if len(t) < MIN_TRIGRAM_LENGTH]
+        if not indexed_terms:
+            raise ValueError(f"搜索词过短：至少需要包含一个不少于 {MIN_TRIGRAM_LENGTH} 个字符的词")
+
+        fts = literal_column("search_index")
+        kind = (search_index.c.rowid % SEARCH_KIND_BITS).label("kind")
+        entity_id = search_index.c.rowid.op("/")(SEARCH_KIND_BITS)
+        conditions = [self._visibility_filter(user_id, kind, entity_id)]
+        if types:
+            conditions.append(kind.in_([SEARCH_KINDS[t] for t in types]))
+        for term in short_terms:
+            pattern = _like_pattern(term)
+            conditions.append(or_(
+                search_index.c.title.like(pattern, escape="\\"),
+                search_index.c.body.like(pattern, escape="\\"),
+            ))
+
+        conditions.append(fts.op("MATCH")(build_match_query(indexed_terms)))
+        score = func.bm25(fts, TITLE_WEIGHT, BODY_WEIGHT)
+        title = func.highlight(fts, 0, HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE)
+        snippet = func.snippet(fts, 1, HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, "…", SNIPPET_TOKENS)
+
+        stmt = select(
+            kind,
+            entity_id.label("entity_id"),
+            search_index.c.parent_id,
+            title.label("title"),
+            snippet.label("snippet"),
+            score.label("score"),
+        ).where(*conditions).order_by(score, search_index.c.rowid.desc()).offset(skip).limit(limit)
+
+        rows = (await self.db.execute(stmt)).all()
+        return [
+            SearchResult(
+                type=_KIND_NAMES[row.kind],
+                id=row.entity_id,
+                parent_id=row.parent_id,
+                title=render_highlight(row.title),
+                snippet=render_highlight(row.snippet),
+                score=round(0.0 - row.score, 4),
+            )
+            for row in rows
+        ]
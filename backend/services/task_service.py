@@ -1,7 +1,12 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from api.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskWithSubtasks
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, exists, or_, func
+from api.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskWithSubtasks, SubtaskResponse
 from models.task import Task, TaskPriority as ModelTaskPriority
+from models.subtask import Subtask
+from models.project_membership import ProjectMembership
+from services.pagination import keyset_before, split_page
 from sqlalchemy.exc import NoResultFound
 import logging
 from datetime import datetime
@@ -9,7 +14,7 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 class TaskService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     def _map_priority(self, priority: str) -> ModelTaskPriority:
@@ -24,31 +29,61 @@ class TaskService:
                 return ModelTaskPriority.MEDIUM
         return ModelTaskPriority.MEDIUM
 
+    def _project_service(self):
+        # 延迟导入，避免与 api 包之间的循环导入
+        from services.project_service import ProjectService
+        return ProjectService(self.db)
+
+    def _to_subtask_response(self, subtask: Subtask) -> SubtaskResponse:
+        return SubtaskResponse(
+            id=subtask.key,
+            title=subtask.title,
+            content=subtask.content or '',
+            assignee_id=subtask.assignee_id,
+            assignee=subtask.assignee_name,
+            created_at=subtask.created_at.isoformat() if subtask.created_at else '',
+        )
+
+    def _build_subtasks(self, db_task: Task, items) -> List[Subtask]:
+        """
+        根据请求数据构建子任务列表。
+        携带已有 id 的子任务原地更新，其余新建，未出现的子任务随任务一起删除（delete-orphan）。
+        """
+        existing = {s.key: s for s in db_task.subtasks}
+        used_keys = set()
+        result: List[Subtask] = []
+
+        for item in items or []:
+            # 兼容字典格式与对象格式的子任务数据
+            data = item if isinstance(item, dict) else item.model_dump()
+            title = data.get('title')
+            if not title:
+                continue
+
+            key = data.get('id') or ''
+            subtask = existing.get(key) if not key.startswith('temp_') else None
+            if subtask is None or key in used_keys:
+                # 新子任务，生成不冲突的ID
+                n = len(result) + 1
+                while f"s{n}" in existing or f"s{n}" in used_keys:
+                    n += 1
+                key = f"s{n}"
+                subtask = Subtask(key=key, created_at=datetime.utcnow())
+            used_keys.add(key)
+
+            subtask.title = title
+            subtask.content = data.get('content') or ''
+            assignee_id = data.get('assignee_id')
+            if assignee_id != subtask.assignee_id:
+                subtask.assignee_name = None
+            subtask.assignee_id = assignee_id
+            subtask.position = len(result)
+            subtask.updated_at = datetime.utcnow()
+            result.append(subtask)
+
+        return result
+
     def _to_task_response(self, db_task: Task) -> TaskResponse:
-        # 处理子任务数据
-        subtasks = []
-        if db_task.subtasks:
-            for subtask in db_task.subtasks:
-                if isinstance(subtask, dict):
-                    # 兼容现有的数据结构，支持assignee和assignee_id
-                    assignee_id = subtask.get('assignee_id')
-                    assignee = subtask.get('assignee')
-                    
-                    # 如果没有assignee_id但有assignee，尝试通过用户名查找用户ID
-                    if not assignee_id and assignee:
-                        # 这里可以添加通过用户名查找用户ID的逻辑
-                        # 暂时保持兼容性
-                        pass
-                    
-                    subtasks.append({
-                        'id': subtask.get('id', ''),
-                        'title': subtask.get('title', ''),
-                        'content': subtask.get('content', ''),
-                        'assignee_id': assignee_id,
-                        'assignee': assignee,  # 保持向后兼容
-                        'created_at': subtask.get('created_at', '')
-                    })
-        
         # 组装响应
         return TaskResponse(
             id=db_task.id,
@@ -62,53 +97,47 @@ class TaskService:
             assignee_id=db_task.assignee_id,
             created_at=db_task.created_at,
             updated_at=db_task.updated_at,
-            subtasks=subtasks,  # 添加子任务数据
+            subtasks=[self._to_subtask_response(st) for st in db_task.subtasks],
         )
 
-    def _can_user_access_task(self, task: Task, user_id: int) -> bool:
+    def _visibility_filter(self, user_id: int):
+        """
+        构建任务可见性的SQL条件，用户可以看到以下任务：
+        1. 自己创建的任务
+        2. 分配给自己的任务
+        3. 子任务处理人是自己的任务
+        4. 任务所属项目的成员
+        """
+        # 子任务处理人 - 走 subtask.assignee_id 索引
+        subtask_tasks = select(Subtask.task_id).where(Subtask.assignee_id == user_id)
+
+        # 用户所在项目（非关联子查询，只计算一次）
+        member_projects = select(ProjectMembership.project_id).where(
+            ProjectMembership.user_id == user_id
+        )
+
+        return or_(
+            Task.creator_id == user_id,
+            Task.assignee_id == user_id,
+            Task.id.in_(subtask_tasks),
+            Task.project_id.in_(member_projects),
+        )
+
+    async def _can_user_access_task(self, task: Task, user_id: int) -> bool:
         """检查用户是否有权限访问任务"""
-        # 任务创建人
-        if task.creator_id == user_id:
-            return True
-        
-        # 任务责任人
-        if task.assignee_id == user_id:
-            return True
-        
-        # 子任务处理人 - 检查子任务的assignee_id
-        if task.subtasks:
-            for subtask in task.subtasks:
-                if isinstance(subtask, dict) and subtask.get('assignee_id') == user_id:
-                    return True
-        
-        # 项目成员也可以看到该任务
-        if task.project_id:
-            from models.project_membership import ProjectMembership
-            project_member = self.db.query(ProjectMembership).filter(
-                ProjectMembership.project_id == task.project_id,
-                ProjectMembership.user_id == user_id
-            ).first()
-            if project_member:
-                return True
-        
-        return False
+        return bool(await self.db.scalar(select(
+            exists().where(Task.id == task.id, self._visibility_filter(user_id))
+        )))
+
+    async def _get_task(self, task_id: int) -> Optional[Task]:
+        """获取任务并预加载子任务（异步会话不支持隐式懒加载）"""
+        stmt = select(Task).options(selectinload(Task.subtasks)).where(
+            Task.id == task_id
+        ).execution_options(populate_existing=True)
+        return await self.db.scalar(stmt)
 
     async def create_task(self, task: TaskCreate, creator_id: int) -> TaskResponse:
         """创建任务"""
-        # 处理子任务数据
-        subtasks_data = None
-        if hasattr(task, 'subtasks') and task.subtasks:
-            subtasks_data = []
-            for subtask in task.subtasks:
-                if hasattr(subtask, 'title') and subtask.title:
-                    subtasks_data.append({
-                        'id': f"s{len(subtasks_data) + 1}",
-                        'title': subtask.title,
-                        'content': getattr(subtask, 'content', ''),
-                        'assignee_id': getattr(subtask, 'assignee_id', None),  # 保存 user_id
-                        'created_at': datetime.utcnow().isoformat()
-                    })
-        
         db_task = Task(
             title=task.title,
             content=task.content,  # 使用content字段
@@ -116,15 +145,19 @@ class TaskService:
             project_id=task.project_id,
             creator_id=creator_id,
             assignee_id=task.assignee_id,
-            subtasks=subtasks_data,  # 保存子任务JSON数据
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow(),
             start_date=task.start_date,  # 添加开始时间
             end_date=task.end_date,      # 添加结束时间
         )
+        db_task.subtasks = self._build_subtasks(db_task, task.subtasks)
         self.db.add(db_task)
-        self.db.commit()
-        self.db.refresh(db_task)
+        # 同一事务内维护项目计数
+        await self._project_service().adjust_project_counters(
+            db_task.project_id, task_delta=1, subtask_delta=len(db_task.subtasks)
+        )
+        await self.db.commit()
+        db_task = await self._get_task(db_task.id)
         return self._to_task_response(db_task)
 
     async def get_tasks(
@@ -134,74 +167,48 @@ class TaskService:
         limit: int = 20,
         project_id: Optional[int] = None,
         status_filter: Optional[str] = None,
-        assignee_id: Optional[int] = None
-    ) -> List[TaskResponse]:
-        """获取任务列表"""
-        # 先获取基本的任务列表
-        query = self.db.query(Task)
+        assignee_id: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[TaskResponse], Optional[int], Optional[str]]:
+        """
+        获取任务列表，返回 (当前页任务, 总数, 下一页游标)
+        传入 cursor 时使用游标分页并忽略 skip；总数只在首页（未传 cursor）计算，
+        后续页返回 None，避免每页都对全部可见任务做 COUNT
+        """
+        # 权限过滤与筛选条件全部在SQL层面完成，保证分页与总数准确
+        conditions = [self._visibility_filter(user_id)]
         if project_id is not None:
-            query = query.filter(Task.project_id == project_id)
-        
-        # 获取所有任务，然后在Python层面进行权限过滤
-        all_tasks = query.offset(skip).limit(limit).all()
-        
-        # 权限过滤：用户可以看到以下任务
-        accessible_tasks = []
-        for task in all_tasks:
-            # 1. 自己创建的任务
-            if task.creator_id == user_id:
-                accessible_tasks.append(task)
-                continue
-            
-            # 2. 分配给自己的任务
-            if task.assignee_id == user_id:
-                accessible_tasks.append(task)
-                continue
-            
-            # 3. 子任务处理人是自己的任务
-            if task.subtasks:
-                for subtask in task.subtasks:
-                    if isinstance(subtask, dict) and subtask.get('assignee_id') == user_id:
-                        accessible_tasks.append(task)
-                        break
-                continue
-            
-            # 4. 任务所属项目的成员也可以看到该任务
-            if task.project_id:
-                # 检查用户是否是项目成员
-                from models.project_membership import ProjectMembership
-                project_member = self.db.query(ProjectMembership).filter(
-                    ProjectMembership.project_id == task.project_id,
-                    ProjectMembership.user_id == user_id
-                ).first()
-                if project_member:
-                    accessible_tasks.append(task)
-                    continue
-        
-        # 如果指定了assignee_id，进一步过滤
+            conditions.append(Task.project_id == project_id)
         if assignee_id is not None:
-            accessible_tasks = [t for t in accessible_tasks if t.assignee_id == assignee_id]
-        
-        return [self._to_task_response(t) for t in accessible_tasks]
+            conditions.append(Task.assignee_id == assignee_id)
+
+        total = None
+        if not cursor:
+            total = await self.db.scalar(select(func.count(Task.id)).where(*conditions))
+        stmt = select(Task).options(selectinload(Task.subtasks)).where(*conditions).order_by(
+            Task.created_at.desc(), Task.id.desc()
+        )
+        after = keyset_before(Task.created_at, Task.id, cursor)
+        if after is not None:
+            stmt = stmt.where(after)
+        else:
+            stmt = stmt.offset(skip)
+        tasks = (await self.db.execute(stmt.limit(limit + 1))).scalars().all()
+        tasks, next_cursor = split_page(tasks, limit, lambda t: (t.created_at, t.id))
+
+        return [self._to_task_response(t) for t in tasks], total, next_cursor
 
     async def get_task(self, task_id: int, user_id: int) -> TaskWithSubtasks:
         """获取任务详情"""
-        db_task = self.db.query(Task).filter(Task.id == task_id).first()
+        db_task = await self._get_task(task_id)
         if not db_task:
             raise NoResultFound(f"Task {task_id} not found")
         
         # 权限检查：用户是否有权限查看这个任务
-        if not self._can_user_access_task(db_task, user_id):
+        if not await self._can_user_access_task(db_task, user_id):
             raise PermissionError("无权限查看该任务")
         
-        # 获取子任务 - 从JSON字段中读取
-        subtasks = []
-        if db_task.subtasks:
-            subtasks = db_task.subtasks
-        
-        task_resp = TaskWithSubtasks(**self._to_task_response(db_task).model_dump())
-        task_resp.subtasks = subtasks
-        return task_resp
+        return TaskWithSubtasks(**self._to_task_response(db_task).model_dump())
 
     async def update_task(
         self,
@@ -210,12 +217,15 @@ class TaskService:
         user_id: int
     ) -> TaskResponse:
         """更新任务"""
-        db_task = self.db.query(Task).filter(Task.id == task_id).first()
+        db_task = await self._get_task(task_id)
         if not db_task:
             raise NoResultFound(f"Task {task_id} not found")
         # 权限校验（可根据需求调整）
         if db_task.creator_id != user_id and db_task.assignee_id != user_id:
             raise PermissionError("无权限操作该任务")
+        # 记录变更前的项目与子任务数，用于维护项目计数
+        old_project_id = db_task.project_id
+        old_subtask_count = len(db_task.subtasks)
         # 字段映射与更新
         payload = task_update.model_dump(exclude_unset=True)
         
@@ -245,68 +255,42 @@ class TaskService:
             logger.info(f"设置后的优先级: {db_task.priority}")
         # 处理子任务更新
         if "subtasks" in payload:
-            logger.info(f"处理子任务更新，原始子任务: {db_task.subtasks}")
             logger.info(f"新的子任务数据: {payload['subtasks']}")
-            
-            subtasks_data = []
-            if payload["subtasks"]:
-                for subtask in payload["subtasks"]:
-                    logger.info(f"处理子任务: {subtask}, 类型: {type(subtask)}")
-                    # 处理字典格式的子任务数据
-                    if isinstance(subtask, dict):
-                        title = subtask.get('title', '')
-                        logger.info(f"字典格式子任务，标题: {title}")
-                        if title:  # 检查标题是否存在且不为空
-                            # 如果是新子任务，生成ID
-                            subtask_id = subtask.get('id', '')
-                            if not subtask_id or subtask_id.startswith('temp_'):
-                                subtask_id = f"s{len(subtasks_data) + 1}"
-                            
-                            subtask_data = {
-                                'id': subtask_id,
-                                'title': title,
-                                'content': subtask.get('content', ''),
-                                'assignee_id': subtask.get('assignee_id'),
-                                'created_at': subtask.get('created_at', datetime.utcnow().isoformat())
-                            }
-                            subtasks_data.append(subtask_data)
-                            logger.info(f"添加子任务数据: {subtask_data}")
-                    # 处理对象格式的子任务数据（向后兼容）
-                    elif hasattr(subtask, 'title') and subtask.title:
-                        # 如果是新子任务，生成ID
-                        subtask_id = getattr(subtask, 'id', None)
-                        if not subtask_id or subtask_id.startswith('temp_'):
-                            subtask_id = f"s{len(subtasks_data) + 1}"
-                        
-                        subtasks_data.append({
-                            'id': subtask_id,
-                            'title': subtask.title,
-                            'content': getattr(subtask, 'content', ''),
-                            'assignee_id': getattr(subtask, 'assignee_id', None),
-                            'created_at': getattr(subtask, 'created_at', datetime.utcnow().isoformat())
-                        })
-            
-            logger.info(f"处理后的子任务数据: {subtasks_data}")
-            logger.info(f"设置前的 db_task.subtasks: {db_task.subtasks}")
-            db_task.subtasks = subtasks_data
-            logger.info(f"设置后的 db_task.subtasks: {db_task.subtasks}")
+            db_task.subtasks = self._build_subtasks(db_task, payload["subtasks"])
         else:
             logger.info("没有接收到子任务数据")
         
         db_task.updated_at = datetime.utcnow()
-        logger.info(f"提交前的完整任务数据: {db_task.subtasks}")
-        self.db.commit()
+        
+        # 同一事务内维护项目计数
+        project_service = self._project_service()
+        new_subtask_count = len(db_task.subtasks)
+        if db_task.project_id == old_project_id:
+            await project_service.adjust_project_counters(
+                old_project_id, subtask_delta=new_subtask_count - old_subtask_count
+            )
+        else:
+            await project_service.adjust_project_counters(
+                old_project_id, task_delta=-1, subtask_delta=-old_subtask_count
+            )
+            await project_service.adjust_project_counters(
+                db_task.project_id, task_delta=1, subtask_delta=new_subtask_count
+            )
+        
+        await self.db.commit()
         logger.info(f"数据库提交完成")
-        self.db.refresh(db_task)
-        logger.info(f"刷新后的任务数据: {db_task.subtasks}")
+        db_task = await self._get_task(task_id)
         return self._to_task_response(db_task)
 
     async def delete_task(self, task_id: int, user_id: int):
         """删除任务"""
-        db_task = self.db.query(Task).filter(Task.id == task_id).first()
+        db_task = await self._get_task(task_id)
         if not db_task:
             raise NoResultFound(f"Task {task_id} not found")
         if db_task.creator_id != user_id:
             raise PermissionError("只有创建者可以删除任务")
-        self.db.delete(db_task)
-        self.db.commit() 
\ No newline at end of file
+        await self._project_service().adjust_project_counters(
+            db_task.project_id, task_delta=-1, subtask_delta=-len(db_task.subtasks)
+        )
+        await self.db.delete(db_task)
+        await self.db.commit() 
\ No newline at end of file
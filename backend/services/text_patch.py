@@ -0,0 +1,34 @@
+"""
+文档内容的增量修改
+
+客户端提交基于某个版本（content_hash）的替换操作列表，服务端校验版本后应用，
+请求体大小只与修改量有关。偏移量按 UTF-16 码元计算，与浏览器中 JavaScript 字符串下标一致。
+"""
+import hashlib
+from typing import Iterable, Tuple
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def apply_splices(content: str, splices: Iterable[Tuple[int, int, str]]) -> str:
+    """
+    按 (start, end, text) 将 content[start:end] 替换为 text，偏移量均相对于原文。
+    各操作需按 start 升序且互不重叠，越界、重叠或切开代理对时抛出 ValueError。
+    """
+    data = content.encode("utf-16-le")
+    length = len(data) // 2
+    parts = []
+    position = 0
+    for start, end, text in splices:
+        if start < position or end < start or end > length:
+            raise ValueError("修改范围无效：需按起始位置升序、互不重叠且不超出原文")
+        parts.append(data[position * 2:start * 2])
+        parts.append(text.encode("utf-16-le", "surrogatepass"))
+        position = end
+    parts.append(data[position * 2:])
+    try:
+        return b"".join(parts).decode("utf-16-le")
+    except UnicodeDecodeError:
+        raise ValueError("修改范围无效：不能拆分代理对字符") from None
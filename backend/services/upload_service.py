@@ -0,0 +1,153 @@
+"""
+内容寻址的上传存储
+
+文件按 SHA-256 存放在 UPLOAD_DIR/blobs/<前2位>/<3-4位>/<sha256>，
+相同内容只保存一份，upload_blob 表记录引用计数，upload_blob_ref 记录每条引用的上传者。对外文件名为 <sha256><扩展名>，
+内容不变则 URL 不变，可永久缓存。
+"""
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import UPLOAD_DIR, IMAGE_RENDITION_SIZES, IMAGE_RENDITION_FORMATS
+from models.upload_blob import UploadBlob, UploadBlobRef
+from services.file_storage import commit_file, discard
+
+BLOB_DIR = Path(UPLOAD_DIR) / "blobs"
+EXT_RE = re.compile(r"\.[0-9A-Za-z_-]{1,10}")
+BLOB_NAME_RE = re.compile(r"^([0-9a-f]{64})(\.[0-9A-Za-z_-]{1,10})?$")
+
+
+def parse_blob_name(filename: str) -> Optional[str]:
+    """文件名为内容哈希时返回 sha256，否则返回 None（旧的 uuid 文件名）"""
+    match = BLOB_NAME_RE.match(filename)
+    return match.group(1) if match else None
+
+
+def blob_path(sha256: str) -> Path:
+    return BLOB_DIR / sha256[:2] / sha256[2:4] / sha256
+
+
+def rendition_path(sha256: str, size: int, fmt: str) -> Path:
+    """缩略图与原文件存放在同一目录：<sha256>.w<尺寸>.<格式>"""
+    return blob_path(sha256).with_name(f"{sha256}.w{size}.{fmt}")
+
+
+def missing_renditions(sha256: str) -> List[Tuple[int, str, str]]:
+    """返回尚未生成的缩略图 (尺寸, 格式, 路径) 列表"""
+    targets = []
+    for size in IMAGE_RENDITION_SIZES:
+        for fmt in IMAGE_RENDITION_FORMATS:
+            path = rendition_path(sha256, size, fmt)
+            if not path.exists():
+                targets.append((size, fmt, str(path)))
+    return targets
+
+
+def select_rendition(sha256: str, width: int, accept: str) -> Optional[Tuple[Path, str]]:
+    """
+    选择不小于 width 的最小缩略图，都不够大时用最大的一档；
+    客户端接受 WebP 时优先 WebP。缩略图尚未生成时返回 None。
+    """
+    sizes = sorted(IMAGE_RENDITION_SIZES)
+    if not sizes:
+        return None
+    size = next((s for s in sizes if s >= width), sizes[-1])
+    formats = [f for f in IMAGE_RENDITION_FORMATS if f != "webp" or "image/webp" in accept]
+    formats.sort(key=lambda f: f != "webp")
+    for fmt in formats:
+        path = rendition_path(sha256, size, fmt)
+        if path.exists():
+            return path, fmt
+    return None
+
+
+class UploadService:
+    """
+    文件的移动与删除都在持有数据库写锁时完成：store 先写 upload_blob 再放置文件，
+    release 在计数归零后重新获取写锁、确认计数仍为 0 才删除文件，两者不会交错。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def store(
+        self, temp_path: Path, sha256: str, size: int, ext: str, content_type: Optional[str], user_id: int
+    ) -> str:
+        """
+        保存临时文件并为 user_id 增加一条引用，返回文件名（sha256 + 扩展名）。
+        内容已存在时丢弃临时文件，直接复用已有文件及其首次上传时的扩展名。
+        """
+        if not EXT_RE.fullmatch(ext):
+            ext = ""
+        stmt = insert(UploadBlob).values(
+            sha256=sha256, ext=ext, content_type=content_type, size=size, ref_count=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UploadBlob.sha256],
+            set_={"ref_count": UploadBlob.ref_count + 1},
+        ).returning(UploadBlob.ext)
+        try:
+            # upsert 取得写锁后再检查与放置文件，期间 release 无法删除同一文件
+            stored_ext = (await self.db.execute(stmt)).scalar_one()
+            path = blob_path(sha256)
+            if path.exists():
+                discard(temp_path)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                commit_file(temp_path, path)
+            self.db.add(UploadBlobRef(sha256=sha256, user_id=user_id))
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            raise
+        return f"{sha256}{stored_ext}"
+
+    async def get_ext(self, sha256: str) -> Optional[str]:
+        """返回文件首次上传时记录的扩展名，文件不存在时返回 None"""
+        return (await self.db.execute(
+            select(UploadBlob.ext).where(UploadBlob.sha256 == sha256)
+        )).scalar_one_or_none()
+
+    async def release(self, sha256: str, user_id: int) -> bool:
+        """
+        释放 user_id 持有的一条引用，计数归零时删除记录与文件。
+        用户没有该文件的引用时返回 False。
+        """
+        ref_id = (await self.db.execute(
+            delete(UploadBlobRef)
+            .where(UploadBlobRef.id == select(UploadBlobRef.id).where(
+                UploadBlobRef.sha256 == sha256, UploadBlobRef.user_id == user_id
+            ).limit(1).scalar_subquery())
+            .returning(UploadBlobRef.id)
+        )).scalar_one_or_none()
+        if ref_id is None:
+            await self.db.rollback()
+            return False
+        ref_count = (await self.db.execute(
+            update(UploadBlob)
+            .where(UploadBlob.sha256 == sha256, UploadBlob.ref_count > 0)
+            .values(ref_count=UploadBlob.ref_count - 1)
+            .returning(UploadBlob.ref_count)
+        )).scalar_one_or_none()
+        await self.db.commit()
+        if ref_count == 0:
+            await self._remove_if_unreferenced(sha256)
+        return True
+
+    async def _remove_if_unreferenced(self, sha256: str):
+        """重新取得写锁并确认计数仍为 0（期间可能有新的上传）后，在提交前删除文件"""
+        try:
+            removed = (await self.db.execute(
+                delete(UploadBlob).where(UploadBlob.sha256 == sha256, UploadBlob.ref_count == 0)
+            )).rowcount == 1
+            if removed:
+                discard(blob_path(sha256))
+                for path in blob_path(sha256).parent.glob(f"{sha256}.w*"):
+                    discard(path)
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            raise
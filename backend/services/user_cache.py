@@ -0,0 +1,77 @@
+"""
+认证缓存：已验证令牌与当前用户快照
+缓存为进程内缓存，多进程部署时依赖 TTL 保证最终一致
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from config import AUTH_USER_CACHE_TTL, AUTH_USER_CACHE_SIZE, AUTH_TOKEN_CACHE_SIZE
+from models.user import User
+from services.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """当前登录用户的只读快照，不绑定数据库会话"""
+    id: int
+    email: Optional[str]
+    name: Optional[str]
+    phone: Optional[str]
+    role: str
+    status: str
+    avatar: Optional[str]
+    hire_date: Optional[datetime]
+    contract_expiry: Optional[datetime]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            phone=user.phone,
+            role=user.role,
+            status=user.status,
+            avatar=user.avatar,
+            hire_date=user.hire_date,
+            contract_expiry=user.contract_expiry,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+# 用户ID -> CurrentUser
+_user_cache = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+# 令牌 -> 用户ID，过期时间不超过令牌本身的 exp
+_token_cache = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+
+
+def get_cached_token_user_id(token: str) -> Optional[int]:
+    return _token_cache.get(token)
+
+
+def cache_token(token: str, user_id: int, expires_at: Optional[float] = None):
+    """缓存已验证签名的令牌"""
+    ttl = AUTH_USER_CACHE_TTL
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        _token_cache.set(token, user_id, ttl=ttl)
+
+
+def get_cached_user(user_id: int) -> Optional[CurrentUser]:
+    return _user_cache.get(user_id)
+
+
+def cache_user(user: User) -> CurrentUser:
+    snapshot = CurrentUser.from_user(user)
+    _user_cache.set(user.id, snapshot)
+    return snapshot
+
+
+def invalidate_user(user_id: int):
+    """用户信息（角色、状态、资料）变更或删除后调用"""
+    _user_cache.pop(user_id)
@@ -3,6 +3,7 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from models.user import User
 from api.schemas.user import UserUpdate, UserResponse, UserStatus
+from services.user_cache import invalidate_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -60,6 +61,7 @@ class UserService:
         user.updated_at = datetime.utcnow()
         self.db.commit()
         self.db.refresh(user)
+        invalidate_user(user.id)
         
         return UserResponse(
             id=user.id,
@@ -88,6 +90,7 @@ class UserService:
         user.updated_at = datetime.utcnow()
         self.db.commit()
         self.db.refresh(user)
+        invalidate_user(user.id)
         
         return UserResponse(
             id=user.id,
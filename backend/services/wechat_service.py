@@ -1,5 +1,6 @@
 import uuid
-import httpx
+from services.http_client import get_upstream_client
+from services.user_cache import invalidate_user
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
 from models.user import User
@@ -12,6 +13,7 @@ class WeChatService:
         self.app_id = WECHAT_APP_ID
         self.app_secret = WECHAT_APP_SECRET
         self.base_url = "https://api.weixin.qq.com"
+        self.http = get_upstream_client("wechat_api")
 
     def generate_session_id(self) -> str:
         """生成唯一的会话ID"""
@@ -53,10 +55,9 @@ class WeChatService:
             "grant_type": "authorization_code"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            if response.status_code == 200:
-                return response.json()
+        response = await self.http.get(url, params=params)
+        if response.status_code == 200:
+            return response.json()
         return None
 
     async def get_user_info(self, access_token: str, openid: str) -> Optional[Dict[str, Any]]:
@@ -68,10 +69,9 @@ class WeChatService:
             "lang": "zh_CN"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
-            if response.status_code == 200:
-                return response.json()
+        response = await self.http.get(url, params=params)
+        if response.status_code == 200:
+            return response.json()
         return None
 
     def get_or_create_user(self, db: Session, wechat_user_info: Dict[str, Any]) -> User:
@@ -91,6 +91,7 @@ class WeChatService:
                 # 更新openid
                 user.openid = openid
                 db.commit()
+                invalidate_user(user.id)
                 return user
         
         # 创建新用户
@@ -0,0 +1,55 @@
+"""
+扫码登录状态查询合并
+
+同一 key 的并发轮询共享一次上游请求，结果短时缓存；客户端可长轮询等待状态变化。
+无论登录页开了多少个、轮询多频繁，每个 key 对上游的请求频率不超过每个缓存周期一次。
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from config import WECHAT_STATUS_CACHE_TTL, WECHAT_STATUS_CACHE_SIZE
+from services.cache import TTLCache
+
+# 终态：到达后不会再变化，无需继续等待
+TERMINAL_STATUSES = {"success", "expired"}
+
+
+class LoginStatusCoalescer:
+    def __init__(self, fetch: Callable[[str], Awaitable[Dict[str, Any]]], ttl: float, maxsize: int):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str) -> Dict[str, Any]:
+        """返回上游响应；缓存有效时直接返回，已有进行中的请求时等待其结果"""
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._inflight[key] = task
+        # shield：某个客户端断开不会取消其他客户端共享的上游请求
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str) -> Dict[str, Any]:
+        try:
+            data = await self._fetch(key)
+            self._cache.set(key, data)
+            return data
+        finally:
+            self._inflight.pop(key, None)
+
+    async def wait_for_change(self, key: str, known_status: Optional[str], timeout: float) -> Dict[str, Any]:
+        """
+        长轮询：等待状态与 known_status 不同或到达终态，最多 timeout 秒，超时返回最新结果
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            data = await self.get(key)
+            status = (data.get("data") or {}).get("status")
+            remaining = deadline - time.monotonic()
+            if status != known_status or status in TERMINAL_STATUSES or remaining <= 0:
+                return data
+            await asyncio.sleep(min(self.ttl, remaining))